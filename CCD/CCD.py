@@ -8,7 +8,7 @@ import csv
 import time
 import html
 import numpy
-import ssdeep
+import bisect
 import argparse
 import traceback
 import multiprocessing
@@ -18,35 +18,66 @@ from polyleven import levenshtein
 
 from utils import settings
 from utils.parser import parser
-from utils.normalizer import clear_parser_identifiers, normalize_child
-from utils.utils import colors, remove_comments, remove_assembly, generate_ngrams
-from utils.elasticsearch import load_database_mapping, add_document_to_index, get_document_by_id, get_matching_items_for_fingerprint
-
-def store_fingerprint(file_name):
+from utils.parser.prediction_cache import warm_up_prediction_cache, get_prediction_cache_size, load_prediction_cache, save_prediction_cache
+from utils.cache import get_cache_key, get_cached_fingerprint, store_cached_fingerprint
+from utils.fingerprint import Fingerprint
+from utils.hashing import hash_token, get_hash_statistics, print_hash_statistics
+from utils.normalizer import Normalizer
+from utils.utils import colors, remove_comments, remove_assembly, generate_ngrams, split_sequence_into_tokens, split_normalized_source_code
+from utils.backends import BACKENDS, get_backend
+
+def get_document_id(file_name):
+    return file_name.split("/")[-1].replace(".sol", "")
+
+def generate_document(file_name):
     start = time.time()
     fingerprint = generate_fingerprint(file_name)
-    id = file_name.split("/")[-1].replace(".sol", "")
-    results = get_document_by_id(id, index=index)
-    if results["hits"]["total"]["value"] > 0:
-        if debug:
-            print("Already generated and stored fingerprint for '"+colors.INFO+file_name.split("/")[-1]+colors.END+"'!")
-    else:
-        add_document_to_index(fingerprint, index=index, id=id)
-        if debug:
-            print("Generated and stored fingerprint for "+colors.OK+"'"+file_name.split("/")[-1]+"'"+colors.END)
-    return time.time() - start
+    return get_document_id(file_name), fingerprint, time.time() - start, (os.getpid(), get_hash_statistics(), parser.get_parse_statistics())
+
+def stream_documents(results, execution_times, hash_statistics, parse_statistics):
+    for id, document, execution_time, (pid, statistics, parsing) in results:
+        execution_times.append(execution_time)
+        # Hash and parse statistics are cumulative per worker process
+        hash_statistics[pid] = statistics
+        parse_statistics[pid] = parsing
+        if settings.DEBUG_MODE:
+            print("Generated fingerprint for "+colors.OK+"'"+document["file_name"]+"'"+colors.END)
+        yield id, document
 
-def generate_fingerprint(file_name):
-    start = time.time()
-    result = dict()
+def print_parse_statistics(sll_parses, ll_fallbacks):
+    parses = sll_parses + ll_fallbacks
+    fallback_rate = ll_fallbacks / parses * 100 if parses else 0.0
+    print("SLL parses:", colors.INFO+str(sll_parses)+colors.END+", fallbacks to LL:", colors.INFO+str(ll_fallbacks)+colors.END, "("+colors.INFO+"{:.2f}".format(fallback_rate)+"%"+colors.END+")")
 
+def load_parser_prediction_cache():
+    try:
+        if load_prediction_cache(settings.PREDICTION_CACHE_FILE) and settings.DEBUG_MODE:
+            print("Loaded prediction cache with", colors.INFO+str(get_prediction_cache_size())+colors.END, "DFA state(s).")
+    except Exception as e:
+        print(colors.FAIL+"Prediction cache error:", str(e)+". Parsing without the prediction cache."+colors.END)
+
+def warm_up_parser(file_paths):
+    # Parses an evenly spaced sample of the files before worker processes are forked, so that they
+    # inherit the prediction cache of the parser instead of each building it from scratch
+    if settings.PARSER_WARM_UP_FILES <= 0 or not file_paths:
+        return
+    start = time.time()
+    step = max(1, len(file_paths) // settings.PARSER_WARM_UP_FILES)
+    source_codes = list()
+    for file_path in file_paths[::step][:settings.PARSER_WARM_UP_FILES]:
+        with open(file_path, "r") as f:
+            source_codes.append(preprocess_source_code(f.read()))
+    warm_up_prediction_cache(source_codes)
     if settings.DEBUG_MODE:
-        print("Generating fingerprint...")
+        print("Warmed up the parser with", colors.INFO+str(len(source_codes))+colors.END, "file(s) in", colors.INFO+str(time.time() - start)+colors.END, "second(s).")
 
-    source_code = ""
-    with open(file_name, "r") as f:
-        source_code = f.read()
+def preprocess_source_code(source_code):
+    source_code = html.unescape(source_code)
+    source_code = remove_assembly(source_code)
+    source_code = remove_comments(source_code)
+    return source_code.replace("\n", "")
 
+def normalize_source_code(source_code, file_name):
     errors = ""
 
     # Parse source code to obtain abstract syntax tree
@@ -54,12 +85,9 @@ def generate_fingerprint(file_name):
         print("Parsing source code to obtain abstract syntax tree (AST)...")
     source_unit = None
     try:
-        source_code = html.unescape(source_code)
-        source_code = remove_assembly(source_code)
-        source_code = remove_comments(source_code)
-        source_code = source_code.replace("\n", "")
+        source_code = preprocess_source_code(source_code)
         print(colors.FAIL, end="")
-        source_unit = parser.parse(source_code, loc=False)
+        source_unit = parser.parse(source_code, loc=False, strict=settings.STRICT_PARSING, compact=settings.COMPACT_AST, two_stage=settings.TWO_STAGE_PARSING)
         print(colors.END, end="")
     except Exception as e:
         print(colors.FAIL+traceback.format_exc(), file_name+colors.END)
@@ -72,88 +100,99 @@ def generate_fingerprint(file_name):
     # Normalize source code
     if settings.DEBUG_MODE:
         print("Normalizing source code...")
-    normalized_source_code = ""
+    normalizer = Normalizer()
+    output = list()
+    size = 0
     try:
-        lock = multiprocessing.Lock()
-        with lock:
-            clear_parser_identifiers()
-            if source_unit != None:
-                for child in source_unit.children:
-                    normalized_source_code += normalize_child(child)
+        if source_unit != None:
+            for child in source_unit.children:
+                size = len(output)
+                normalizer.normalize_child(child, output)
     except Exception as e:
+        # Only the children normalized without errors are kept
+        del output[size:]
         print(traceback.format_exc())
         print(colors.FAIL+"Normalization error:", str(e)+". Filename:", file_name+colors.END)
         errors += "Normalization error: "+str(e)+" "
         pass
+    normalized_source_code = "".join(output)
     if settings.DEBUG_MODE:
         print("Normalized source code:", colors.INFO+normalized_source_code+colors.END)
+        print("Normalized nodes per type:", ", ".join([node_type+": "+colors.INFO+str(count)+colors.END for node_type, count in normalizer.node_type_counts.most_common()]))
+
+    return normalized_source_code, errors
+
+def generate_fingerprint(file_name):
+    start = time.time()
+    result = dict()
+
+    if settings.DEBUG_MODE:
+        print("Generating fingerprint...")
+
+    source_code = ""
+    with open(file_name, "r") as f:
+        source_code = f.read()
+
+    # Look up fingerprint of identical source code in cache
+    if settings.FINGERPRINT_CACHE:
+        cache_key = get_cache_key(source_code)
+        cached_result = get_cached_fingerprint(cache_key)
+        if cached_result is not None:
+            result.update(cached_result)
+            result["file_name"] = file_name.split("/")[-1]
+            result["file_path"] = file_name
+            result["execution_time"] = time.time() - start
+            if settings.DEBUG_MODE:
+                print("Found fingerprint in cache.")
+            return result
+
+    normalized_source_code, errors = normalize_source_code(source_code, file_name)
 
     # Generate fingerprint
-    sequence = ""
     fingerprint = list()
     contract_level_fingerprint = list()
     function_level_fingerprint = list()
-    for character in normalized_source_code:
-        if character in ["{", ";", "}"]:
-            updates = list()
-            if "(" in sequence and ")" in sequence:
-                pieces = [x for x in sequence.replace(")", "").split("(") if x]
-                pieces = [x for piece in pieces for x in piece.replace("&&", " && ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace("||", " || ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace(">=", " >= ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace("<=", " <= ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace("==", " == ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace("!=", " != ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace(">", " > ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace("<", " < ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace(".", " . ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace("+", " + ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace("-", " - ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace("/", " / ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace("*", " * ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace(",", " , ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace("!", " ! ").split(" ")]
-                pieces = [x for piece in pieces for x in piece.replace("returns", " returns ").split(" ") if x]
-                if settings.DEBUG_MODE:
-                    print("Tokens:", pieces)
-                hash = "".join([ssdeep.hash(x).split(":")[1] for x in pieces])
-                if settings.DEBUG_MODE:
-                    print(sequence, " ".join([ssdeep.hash(x).split(":")[1] for x in pieces]), " ".join(["'"+x+"'" for x in pieces]))
-            else:
-                hash = ssdeep.hash(sequence).split(":")[1]
-            updates.append((sequence, hash))
-            if function_level_fingerprint and sequence.startswith("contract") or sequence.startswith("library") or sequence.startswith("interface") or sequence.startswith("abstract") or sequence.startswith("function") or sequence.startswith("fallback") or sequence.startswith("constructor") or sequence.startswith("modifier"):
-                contract_level_fingerprint.append(function_level_fingerprint)
-                function_level_fingerprint = list()
-                if settings.DEBUG_MODE:
-                    print()
-            if contract_level_fingerprint and sequence.startswith("contract") or sequence.startswith("library") or sequence.startswith("interface") or sequence.startswith("abstract"):
-                fingerprint.append(contract_level_fingerprint)
-                contract_level_fingerprint = list()
-                if settings.DEBUG_MODE:
-                    print()
-            for update in updates:
-                if update[1]:
-                    function_level_fingerprint.append(update[1])
-                    if settings.DEBUG_MODE:
-                        print(colors.INFO+"'"+update[0]+"'"+colors.END, "-->", colors.INFO+update[1]+colors.END)
-            sequence = ""
+    for sequence in split_normalized_source_code(normalized_source_code):
+        updates = list()
+        if "(" in sequence and ")" in sequence:
+            pieces = split_sequence_into_tokens(sequence)
+            if settings.DEBUG_MODE:
+                print("Tokens:", pieces)
+            hash = "".join([hash_token(x) for x in pieces])
+            if settings.DEBUG_MODE:
+                print(sequence, " ".join([hash_token(x) for x in pieces]), " ".join(["'"+x+"'" for x in pieces]))
         else:
-            sequence += character
+            hash = hash_token(sequence)
+        updates.append((sequence, hash))
+        if function_level_fingerprint and sequence.startswith("contract") or sequence.startswith("library") or sequence.startswith("interface") or sequence.startswith("abstract") or sequence.startswith("function") or sequence.startswith("fallback") or sequence.startswith("constructor") or sequence.startswith("modifier"):
+            contract_level_fingerprint.append(function_level_fingerprint)
+            function_level_fingerprint = list()
+            if settings.DEBUG_MODE:
+                print()
+        if contract_level_fingerprint and sequence.startswith("contract") or sequence.startswith("library") or sequence.startswith("interface") or sequence.startswith("abstract"):
+            fingerprint.append(contract_level_fingerprint)
+            contract_level_fingerprint = list()
+            if settings.DEBUG_MODE:
+                print()
+        for update in updates:
+            if update[1]:
+                function_level_fingerprint.append(update[1])
+                if settings.DEBUG_MODE:
+                    print(colors.INFO+"'"+update[0]+"'"+colors.END, "-->", colors.INFO+update[1]+colors.END)
     if function_level_fingerprint:
         contract_level_fingerprint.append(function_level_fingerprint)
     if contract_level_fingerprint:
         fingerprint.append(contract_level_fingerprint)
     contract_level_fingerprints = list()
     for contract in fingerprint:
-        contract_level_fingerprint = ".".join(["".join(f) for f in contract if f])
+        contract_level_fingerprint = ["".join(f) for f in contract if f]
         if contract_level_fingerprint:
             contract_level_fingerprints.append(contract_level_fingerprint)
-    fingerprint = ":".join(contract_level_fingerprints)
+    fingerprint = Fingerprint(contract_level_fingerprints)
     end = time.time()
 
     size_normalized_source_code = len(normalized_source_code)
-    size_fingerprint = len(fingerprint)
+    size_fingerprint = len(fingerprint.text)
     compression_ratio = 0.0
     try:
         compression_ratio = 100 - size_fingerprint / size_normalized_source_code * 100
@@ -162,13 +201,17 @@ def generate_fingerprint(file_name):
 
     result["file_name"] = file_name.split("/")[-1]
     result["file_path"] = file_name
-    result["fingerprint"] = fingerprint
+    result["fingerprint"] = fingerprint.text
+    result["fingerprint_contracts"] = fingerprint.contracts
     result["size_normalized_source_code"] = size_normalized_source_code
     result["size_fingerprint"] = size_fingerprint
     result["compression_ratio"] = compression_ratio
     result["execution_time"] = end - start
     result["errors"] = errors
 
+    if settings.FINGERPRINT_CACHE:
+        store_cached_fingerprint(cache_key, result)
+
     if settings.DEBUG_MODE:
         print("Fingerprint generation took:", colors.INFO+str(end - start), "second(s)"+colors.END)
         print("Normalized source code size:", colors.INFO+str(size_normalized_source_code)+colors.END)
@@ -177,54 +220,101 @@ def generate_fingerprint(file_name):
 
     return result
 
-def compare(fp1, fp2):
+def get_length_bound(len1, len2):
+    max_lev = max(len1, len2)
+    return ((max_lev - abs(len1 - len2)) / max_lev) * 100.0
+
+def get_best_function_score(f1, contract_index):
+    functions, lengths, functions_by_length = contract_index
+    if f1 and f1 in functions:
+        return 100.0
+    # The length ratio is an upper bound of the achievable score, so lengths are visited from
+    # the closest to the farthest and the search stops once no length can beat the best score
+    len1 = len(f1)
+    right = bisect.bisect_left(lengths, len1)
+    left = right - 1
+    best = -1.0
+    while True:
+        left_bound = get_length_bound(len1, lengths[left]) if left >= 0 else -1.0
+        right_bound = get_length_bound(len1, lengths[right]) if right < len(lengths) else -1.0
+        if max(left_bound, right_bound) <= best:
+            break
+        if left_bound >= right_bound:
+            len2 = lengths[left]
+            left -= 1
+        else:
+            len2 = lengths[right]
+            right += 1
+        max_lev = max(len1, len2)
+        for f2 in functions_by_length[len2]:
+            # Distances above k cannot improve the best score and are not computed exactly
+            k = int(max_lev * (100.0 - best) / 100.0) + 1
+            if k < max_lev:
+                lev_dis = levenshtein(f1, f2, k)
+                if lev_dis > k:
+                    continue
+            else:
+                lev_dis = levenshtein(f1, f2)
+            score = ((max_lev - lev_dis) / max_lev) * 100.0
+            if settings.DEBUG_MODE:
+                print("{:.2f}".format(score), "\t", f1, f2)
+            if score > best:
+                best = score
+    return best
+
+def compare(fp1, fp2, threshold=None):
     if settings.DEBUG_MODE:
         start = time.time()
 
-    fp1 = [i.split(".") for i in [h for h in fp1.split(":")]]
-    fp2 = [i.split(".") for i in [h for h in fp2.split(":")]]
+    if isinstance(fp1, str):
+        fp1 = Fingerprint.from_text(fp1)
+    if isinstance(fp2, str):
+        fp2 = Fingerprint.from_text(fp2)
+    fp2_indexes = fp2.get_indexes()
 
     if settings.DEBUG_MODE:
         print()
     l4 = list()
-    for c1 in fp1:
-        l3 = list()
-        for c2 in fp2:
-            l2 = list()
+    l4_sum = 0.0
+    for c1_index, c1 in enumerate(fp1.contracts):
+        c1_size = fp1.sizes[c1_index]
+        l3_max = None
+        # Contracts sharing most identical functions are compared first to prune the others early
+        c1_functions = set(c1)
+        c2_order = sorted(range(len(fp2_indexes)), reverse=True, key=lambda i: sum([len(f) for f in c1_functions & fp2_indexes[i][0]]))
+        for c2_index in c2_order:
             if settings.DEBUG_MODE:
                 print("Score")
                 print("-------------------------------------------------------------------")
                 print()
+            l2_sum = 0
+            l2_size = 0
             for f1 in c1:
-                l1 = list()
-                for f2 in c2:
-                    lev_dis = levenshtein(f1, f2)
-                    max_lev = max(len(f1), len(f2))
-                    score = ((max_lev - lev_dis) / max_lev) * 100.0
-                    if settings.DEBUG_MODE:
-                        print("{:.2f}".format(score), "\t", f1, f2)
-                    l1.append(score)
+                l1_max = get_best_function_score(f1, fp2_indexes[c2_index])
                 if settings.DEBUG_MODE:
-                    print("L1", l1, "-->", max(l1))
+                    print("L1", "-->", l1_max)
                     print()
-                l2.append(max(l1))
-            if len(l2) > 0:
-                if settings.DEBUG_MODE:
-                    print("-------------------------------------------------------------------")
-                    print("L2", l2, "-->", sum(l2) / len(l2))
-                l2_sum = 0
-                l2_size = 0
-                for i in range(len(l2)):
-                    l2_sum += len(c1[i]) * (l2[i] / 100)
-                    l2_size += len(c1[i])
-                l3.append((l2_sum / l2_size) * 100.0)
+                l2_sum += len(f1) * (l1_max / 100)
+                l2_size += len(f1)
+                # Stop once this contract can no longer reach the best score of the previous ones
+                if l3_max is not None and ((l2_sum + c1_size - l2_size) / c1_size) * 100.0 < l3_max - 1e-9:
+                    break
             else:
+                l3 = (l2_sum / l2_size) * 100.0
                 if settings.DEBUG_MODE:
-                    print("L2", l2, "-->", 0.0)
-                l3.append(0.0)
+                    print("-------------------------------------------------------------------")
+                    print("L2", "-->", l3)
+                if l3_max is None or l3 > l3_max:
+                    l3_max = l3
         if settings.DEBUG_MODE:
-            print("L3", "-->", l3)
-        l4.append(max(l3))
+            print("L3", "-->", l3_max)
+        l4.append(l3_max)
+        l4_sum += l3_max
+        # Stop once the average cannot reach the threshold anymore and return its upper bound
+        if threshold is not None:
+            upper_bound = (l4_sum + 100.0 * (len(fp1.contracts) - c1_index - 1)) / len(fp1.contracts)
+            if upper_bound < threshold - 1e-9:
+                return upper_bound
     if settings.DEBUG_MODE:
         end = time.time()
         print("L4", "-->", l4)
@@ -259,35 +349,119 @@ def match_fingerprint(file_path, index):
     if fp["errors"]:
         print(colors.FAIL+"Error while generating fingerprint for '"+file_path+"'!"+colors.END)
         return time.time() - start_time
-    # Query Elasticsearch for matches based on n-grams
-    matching_items, matching_execution_time = get_matching_items_for_fingerprint(index, fp["fingerprint"], settings.NGRAM_THRESHOLD)
+    # Query the fingerprint store for matches based on n-grams
+    matching_items, matching_execution_time = get_backend().get_matching_items(index, fp["fingerprint"], settings.NGRAM_THRESHOLD)
     if settings.DEBUG_MODE:
         print("Found", colors.INFO+str(len(matching_items))+colors.END, "record(s) in", colors.INFO+str(matching_execution_time)+colors.END, "second(s) matching an n-gram threshold of at least", colors.INFO+str(int(settings.NGRAM_THRESHOLD*100))+"%"+colors.END+".")
     # Filter matches based on levenshtein distance
     levenshtein_execution_time_start = time.time()
     similar_items = list()
-    for match in matching_items:
-        similarity_score = compare(fp["fingerprint"], match[2])
-        if similarity_score >= int(settings.LEVENSHTEIN_TRESHOLD*100):
-            similar_items.append([match[0], similarity_score, match[1]])
+    query = Fingerprint.from_document(fp)
+    threshold = int(settings.LEVENSHTEIN_TRESHOLD*100)
+    if settings.RERANK_JOBS > 1 and len(matching_items) > settings.RERANK_JOBS:
+        # Candidates are split into chunks in their original order, so concatenating the results
+        # of the chunks yields the same order as reranking them one after another
+        chunk_size = max(1, len(matching_items) // (settings.RERANK_JOBS * 4))
+        chunks = [matching_items[i:i+chunk_size] for i in range(0, len(matching_items), chunk_size)]
+        with multiprocessing.Pool(processes=settings.RERANK_JOBS, initializer=init_rerank_process, initargs=(query, threshold, )) as pool:
+            for chunk_similar_items in pool.imap(rerank_candidates, chunks):
+                similar_items += chunk_similar_items
+    else:
+        init_rerank_process(query, threshold)
+        similar_items = rerank_candidates(matching_items)
     levenshtein_execution_time_end = time.time()
     # Sort results
     similar_items.sort(reverse=True, key=lambda i: i[0])
     # Output results
     if settings.DEBUG_MODE:
         print("Found", colors.INFO+str(len(similar_items))+colors.END, "record(s) in", colors.INFO+str(levenshtein_execution_time_end-levenshtein_execution_time_start)+colors.END, "second(s) matching a levenshtein threshold of at least", colors.INFO+str(int(settings.LEVENSHTEIN_TRESHOLD*100))+"%"+colors.END+".")
+    print_similar_items(similar_items)
+    return time.time() - start_time
+
+def match_fingerprints(file_paths, index):
+    # Batch mode: fingerprints are generated in a pool, queried with multi-search requests
+    # and the candidates of each file are reranked in the pool
+    start_time = time.time()
+    threshold = int(settings.LEVENSHTEIN_TRESHOLD*100)
+    pool = None
+    if settings.RERANK_JOBS > 1:
+        pool = multiprocessing.Pool(processes=settings.RERANK_JOBS)
+    try:
+        fingerprints = pool.imap(generate_fingerprint, file_paths) if pool else map(generate_fingerprint, file_paths)
+        batch = list()
+        for file_path, fp in zip(file_paths, fingerprints):
+            # Files without a fingerprint stay in the batch, so that their error is printed in input order
+            batch.append((file_path, None if fp["errors"] else fp))
+            if len(batch) >= settings.ELASTICSEARCH_MSEARCH_SIZE:
+                match_fingerprint_batch(batch, index, threshold, pool)
+                batch = list()
+        if batch:
+            match_fingerprint_batch(batch, index, threshold, pool)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return time.time() - start_time
+
+def match_fingerprint_batch(batch, index, threshold, pool):
+    fingerprints = [fp for _, fp in batch if fp is not None]
+    matching_items, results = list(), list()
+    if fingerprints:
+        # Query the fingerprint store for matches based on n-grams
+        matching_items, matching_execution_time = get_backend().get_matching_items_batch(index, [fp["fingerprint"] for fp in fingerprints], settings.NGRAM_THRESHOLD)
+        if settings.DEBUG_MODE:
+            print("Queried", colors.INFO+str(len(fingerprints))+colors.END, "fingerprint(s) in", colors.INFO+str(matching_execution_time)+colors.END, "second(s).")
+        # Filter matches based on levenshtein distance
+        tasks = [(Fingerprint.from_document(fp), items, threshold) for fp, items in zip(fingerprints, matching_items)]
+        results = pool.imap(rerank_match, tasks) if pool else map(rerank_match, tasks)
+    matches = zip(matching_items, results)
+    for file_path, fp in batch:
+        print("Matching '"+colors.INFO+file_path+colors.END+"'...")
+        if fp is None:
+            print(colors.FAIL+"Error while generating fingerprint for '"+file_path+"'!"+colors.END)
+            continue
+        items, similar_items = next(matches)
+        if settings.DEBUG_MODE:
+            print("Found", colors.INFO+str(len(items))+colors.END, "record(s) matching an n-gram threshold of at least", colors.INFO+str(int(settings.NGRAM_THRESHOLD*100))+"%"+colors.END+".")
+            print("Found", colors.INFO+str(len(similar_items))+colors.END, "record(s) matching a levenshtein threshold of at least", colors.INFO+str(threshold)+"%"+colors.END+".")
+        print_similar_items(similar_items)
+
+def print_similar_items(similar_items):
     print("N-gram \t Levenshtein \t Contract Address \t\t\t\t File Path")
     print("----------------------------------------------------------------------------------------------------------------")
     for item in similar_items:
         print("{:.2f}".format(item[0]).rjust(6), "\t", "{:.2f}".format(item[1]).rjust(6), "\t", item[2].split("/")[-1].split("_")[0].replace(".sol", ""), "\t", item[2])
-    return time.time() - start_time
 
-def init_process(_index, _debug):
-    global index
-    global debug
+def rerank_match(task):
+    query, candidates, threshold = task
+    init_rerank_process(query, threshold)
+    similar_items = rerank_candidates(candidates)
+    # Sort results
+    similar_items.sort(reverse=True, key=lambda i: i[0])
+    return similar_items
+
+def rerank_candidates(candidates):
+    similar_items = list()
+    for match in candidates:
+        similarity_score = compare(rerank_query, match[2], threshold=rerank_threshold)
+        if similarity_score >= rerank_threshold:
+            similar_items.append([match[0], similarity_score, match[1]])
+    return similar_items
+
+def init_rerank_process(_query, _threshold):
+    global rerank_query
+    global rerank_threshold
+
+    rerank_query = _query
+    rerank_threshold = _threshold
+
+def init_process():
+    # Forked workers inherit the parse statistics of the warm-up in their parent
+    parser.reset_parse_statistics()
 
-    index = _index
-    debug = _debug
+    # Workers that are spawned instead of forked do not inherit the prediction cache of the parser
+    if settings.PREDICTION_CACHE and get_prediction_cache_size() == 0:
+        load_parser_prediction_cache()
 
 def main():
     global args
@@ -300,33 +474,47 @@ def main():
     print("\____/\____/_____/  ")
     print("")
 
-    parser = argparse.ArgumentParser()
-    group = parser.add_mutually_exclusive_group(required=True)
+    argument_parser = argparse.ArgumentParser()
+    group = argument_parser.add_mutually_exclusive_group(required=True)
     group.add_argument(
         "-g", "--generate-fingerprint", type=str, help="Generate fingerprint from Solidity source code or snippet file (e.g., <source_code_file.sol>)")
     group.add_argument(
-        "-s", "--store-fingerprints", type=str, help="Generate fingerprints from folder and store into Elasticsearch (e.g., <source_code_folder>)")
+        "-s", "--store-fingerprints", type=str, help="Generate fingerprints from folder and store into the fingerprint store (e.g., <source_code_folder>)")
     group.add_argument(
-        "-m", "--match-fingerprint", type=str, help="Match fingerprint with fingerprints stored in Elasticsearch")
+        "-m", "--match-fingerprint", type=str, help="Match fingerprint with fingerprints stored in the fingerprint store")
     group.add_argument(
         "-c", "--compare-fingerprint", type=str, help="Takes as input two Solidity source code or snippet files and compares their fingerprint")
-    parser.add_argument(
+    argument_parser.add_argument(
         "--ngram-size", type=int, help="N-gram sized for storing and matching fingerprints (default: '"+str(settings.NGRAM_SIZE)+"')")
-    parser.add_argument(
+    argument_parser.add_argument(
         "--ngram-threshold", type=float, help="N-gram threshold for matching fingerprints (default: '"+str(settings.NGRAM_THRESHOLD)+"')")
-    parser.add_argument(
+    argument_parser.add_argument(
         "--levenshtein-threshold", type=float, help="Levenshtein threshold for matching fingerprints (default: '"+str(settings.LEVENSHTEIN_TRESHOLD)+"')")
-    parser.add_argument(
+    argument_parser.add_argument(
         "--elasticsearch-host", type=str, help="Elasticsearch host (default: '"+settings.ELASTICSEARCH_HOST+"')")
-    parser.add_argument(
+    argument_parser.add_argument(
         "--elasticsearch-port", type=int, help="Elasticsearch port (default: '"+str(settings.ELASTICSEARCH_PORT)+"')")
-    parser.add_argument(
-        "--elasticsearch-index", type=str, help="Elasticsearch index")
-    parser.add_argument(
+    argument_parser.add_argument(
+        "--backend", type=str, choices=list(BACKENDS), help="Fingerprint store used to store and match fingerprints (default: '"+settings.BACKEND+"')")
+    argument_parser.add_argument(
+        "--index", "--elasticsearch-index", dest="index", type=str, help="Index of the fingerprint store")
+    argument_parser.add_argument(
+        "--keep-index", action="store_true", help="Keep fingerprints already stored in the index and only store missing ones")
+    argument_parser.add_argument(
+        "--bulk-size", type=int, help="Number of fingerprints added to the index per bulk request (default: '"+str(settings.ELASTICSEARCH_BULK_SIZE)+"')")
+    argument_parser.add_argument(
+        "--jobs", type=int, help="Number of processes used to generate fingerprints and rerank candidates when matching (default: '"+str(settings.RERANK_JOBS)+"')")
+    argument_parser.add_argument(
+        "--no-cache", action="store_true", help="Do not read or write fingerprints from/to the fingerprint cache ('"+settings.FINGERPRINT_CACHE_FILE+"')")
+    argument_parser.add_argument(
+        "--no-prediction-cache", action="store_true", help="Do not read or write the ANTLR prediction cache ('"+settings.PREDICTION_CACHE_FILE+"')")
+    argument_parser.add_argument(
+        "--strict-parsing", action="store_true", help="Report a parsing error at the first syntax error instead of recovering from it")
+    argument_parser.add_argument(
         "--debug", action="store_true", help="Print debug information to the console")
-    parser.add_argument(
+    argument_parser.add_argument(
         "-v", "--version", action="version", version="Morpheus version "+colors.INFO+"0.0.1"+colors.END)
-    args = parser.parse_args()
+    args = argument_parser.parse_args()
 
     if args.ngram_size:
         settings.NGRAM_SIZE = args.ngram_size
@@ -343,37 +531,84 @@ def main():
     if args.elasticsearch_port:
         settings.ELASTICSEARCH_PORT = args.elasticsearch_port
 
+    if args.backend:
+        settings.BACKEND = args.backend
+
+    if args.keep_index:
+        settings.ELASTICSEARCH_CLEAR_INDEX = False
+
+    if args.bulk_size:
+        settings.ELASTICSEARCH_BULK_SIZE = args.bulk_size
+
+    if args.jobs:
+        settings.RERANK_JOBS = args.jobs
+
+    if args.no_cache:
+        settings.FINGERPRINT_CACHE = False
+
+    if args.no_prediction_cache:
+        settings.PREDICTION_CACHE = False
+
+    if args.strict_parsing:
+        settings.STRICT_PARSING = True
+
     if args.debug:
         settings.DEBUG_MODE = args.debug
 
     sys.setrecursionlimit(settings.PYTHON_RECURSION_LIMIT)
 
+    if settings.PREDICTION_CACHE:
+        load_parser_prediction_cache()
+    prediction_cache_size = get_prediction_cache_size()
+
     if args.generate_fingerprint:
         fp = generate_fingerprint(args.generate_fingerprint)
         print("Fingerpint:", colors.INFO+str(fp["fingerprint"])+colors.END)
+        if settings.DEBUG_MODE:
+            print_hash_statistics(*get_hash_statistics())
+            print_parse_statistics(*parser.get_parse_statistics())
 
     if args.store_fingerprints:
-        if not args.elasticsearch_index:
-            print(colors.FAIL+"Elasticsearch index missing! Please provide an index via --elasticsearch-index"+colors.END)
+        if not args.index:
+            print(colors.FAIL+"Index missing! Please provide an index via --index"+colors.END)
         else:
             # Search for files to be fingerprinted
             print("Searching for Solidity source code files to be fingerprinted...")
             file_paths = find_solidity_source_code_files(args.store_fingerprints)
             print("Found", colors.INFO+str(len(file_paths))+colors.END, "Solidity source code files.")
-            # Generate fingerprints and store them in Elasticsearch
+            # Generate fingerprints and store them in the fingerprint store
             print("Running fingerprint generation with "+colors.INFO+str(multiprocessing.cpu_count())+colors.END+" CPUs.")
             if args.store_fingerprints.endswith("/"):
                 args.store_fingerprints = args.store_fingerprints[0:len(args.store_fingerprints)-1]
-            print("Storing fingerprints to index:", colors.INFO+args.elasticsearch_index+colors.END+".")
+            print("Storing fingerprints to index:", colors.INFO+args.index+colors.END+".")
             print("Using a tokenizer with an n-gram size of", colors.INFO+str(settings.NGRAM_SIZE)+colors.END+".")
-            load_database_mapping(index=args.elasticsearch_index, clear_index=settings.ELASTICSEARCH_CLEAR_INDEX)
+            print("Using the", colors.INFO+settings.BACKEND+colors.END, "backend.")
+            store = get_backend()
+            store.create_index(args.index, clear_index=settings.ELASTICSEARCH_CLEAR_INDEX)
+            if not settings.ELASTICSEARCH_CLEAR_INDEX:
+                # Only schedule files whose fingerprint is not yet stored
+                existing_ids = store.get_existing_document_ids([get_document_id(file_path) for file_path in file_paths], args.index)
+                if existing_ids:
+                    file_paths = [file_path for file_path in file_paths if get_document_id(file_path) not in existing_ids]
+                    print("Skipping", colors.INFO+str(len(existing_ids))+colors.END, "already stored fingerprint(s).")
             execution_times = []
+            hash_statistics = dict()
+            parse_statistics = dict()
             if sys.platform.startswith("linux"):
                 multiprocessing.set_start_method("fork")
-            with multiprocessing.Pool(processes=multiprocessing.cpu_count(), initializer=init_process, initargs=(args.elasticsearch_index, settings.DEBUG_MODE, )) as pool:
+            warm_up_parser(file_paths)
+            # Stored for later runs, which parse single files and therefore cannot warm up the parser
+            if settings.PREDICTION_CACHE and get_prediction_cache_size() > prediction_cache_size:
+                try:
+                    save_prediction_cache(settings.PREDICTION_CACHE_FILE)
+                except Exception as e:
+                    print(colors.FAIL+"Prediction cache error:", str(e)+colors.END)
+            with multiprocessing.Pool(processes=multiprocessing.cpu_count(), initializer=init_process) as pool:
                 start_total = time.time()
-                execution_times += pool.map(store_fingerprint, file_paths)
+                results = pool.imap_unordered(generate_document, file_paths)
+                indexed, existing, failed = store.add_documents(stream_documents(results, execution_times, hash_statistics, parse_statistics), args.index, batch_size=settings.ELASTICSEARCH_BULK_SIZE)
                 end_total = time.time()
+                print("Stored", colors.INFO+str(indexed)+colors.END, "fingerprint(s),", colors.INFO+str(existing)+colors.END, "already existing,", (colors.FAIL if failed else colors.INFO)+str(failed)+colors.END, "failed.")
                 print("Total execution time: "+colors.INFO+str(end_total - start_total)+colors.END)
                 if settings.DEBUG_MODE and execution_times:
                     print()
@@ -381,16 +616,21 @@ def main():
                     print("Mean execution time: "+colors.INFO+str(numpy.mean(execution_times))+colors.END)
                     print("Median execution time: "+colors.INFO+str(numpy.median(execution_times))+colors.END)
                     print("Min execution time: "+colors.INFO+str(numpy.min(execution_times))+colors.END)
+                    print_hash_statistics(sum([hits for hits, _ in hash_statistics.values()]), sum([misses for _, misses in hash_statistics.values()]))
+                    print_parse_statistics(sum([sll_parses for sll_parses, _ in parse_statistics.values()]), sum([ll_fallbacks for _, ll_fallbacks in parse_statistics.values()]))
 
     if args.match_fingerprint:
-        if not args.elasticsearch_index:
-            print(colors.FAIL+"Elasticsearch index missing! Please provide an index via --elasticsearch-index"+colors.END)
+        if not args.index:
+            print(colors.FAIL+"Index missing! Please provide an index via --index"+colors.END)
         elif os.path.exists(args.match_fingerprint):
             print("Matching fingerprints with n-gram threshold of", colors.INFO+str(settings.NGRAM_THRESHOLD)+colors.END, "and Levenshtein threshold of", colors.INFO+str(settings.LEVENSHTEIN_TRESHOLD)+colors.END)
             file_paths = find_solidity_source_code_files(args.match_fingerprint)
             start_total = time.time()
-            for file_path in file_paths:
-                match_fingerprint(file_path, args.elasticsearch_index)
+            if len(file_paths) > 1:
+                match_fingerprints(file_paths, args.index)
+            else:
+                for file_path in file_paths:
+                    match_fingerprint(file_path, args.index)
             end_total = time.time()
             print("Total execution time: "+colors.INFO+str(end_total - start_total)+colors.END)
         else:
@@ -421,9 +661,9 @@ def main():
 
             ngram_score = ngram_score / len(generate_ngrams(fp1["fingerprint"], settings.NGRAM_SIZE)) * 100.0
             print(colors.INFO+"N-gram score:"+colors.END, ngram_score)
-            print(colors.INFO+"Levenshtein score:"+colors.END, compare(fp1["fingerprint"], fp2["fingerprint"]))
+            print(colors.INFO+"Levenshtein score:"+colors.END, compare(Fingerprint.from_document(fp1), Fingerprint.from_document(fp2)))
         else:
-            print(colors.INFO+"Similarity score:"+colors.END, compare(fp1["fingerprint"], fp2["fingerprint"]))
+            print(colors.INFO+"Similarity score:"+colors.END, compare(Fingerprint.from_document(fp1), Fingerprint.from_document(fp2)))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import abc
+import numpy
+import importlib
+
+from utils import settings
+from utils.utils import score_ngram_overlap
+from utils.fingerprint import Fingerprint
+
+# Fingerprint stores by name, given as the module and class implementing them. Modules are only imported
+# when their store is used, so that a store does not require the dependencies of the others.
+BACKENDS = {
+    "elasticsearch": ("utils.elasticsearch", "ElasticsearchStore"),
+    "memory": ("utils.backends.memory", "MemoryStore"),
+    "sqlite": ("utils.backends.sqlite", "SQLiteStore"),
+    "mmap": ("utils.backends.mapped", "MappedStore"),
+    "lsh": ("utils.backends.lsh", "LSHStore"),
+}
+
+# Stores are kept per process and reused for all requests of that process
+global STORES
+STORES = dict()
+
+class FingerprintStore(abc.ABC):
+    """
+    Interface of the stores that index fingerprints and return the candidates matching a fingerprint.
+    Documents are the dictionaries returned by generate_fingerprint. Stores that do not implement every
+    abstract method cannot be instantiated.
+    """
+
+    @abc.abstractmethod
+    def create_index(self, index, clear_index=False):
+        # Creates the index if it does not exist yet, after deleting it if clear_index is set
+        pass
+
+    @abc.abstractmethod
+    def add_documents(self, documents, index, batch_size=settings.ELASTICSEARCH_BULK_SIZE):
+        # Adds (id, document) pairs that are not yet in the index and returns the numbers of indexed,
+        # already existing and failed documents
+        pass
+
+    @abc.abstractmethod
+    def get_existing_document_ids(self, ids, index):
+        pass
+
+    @abc.abstractmethod
+    def get_document(self, id, index):
+        # Returns the document stored under id, or None
+        pass
+
+    @abc.abstractmethod
+    def get_matching_items(self, index, fingerprint, threshold):
+        # Returns the candidates sharing at least threshold of the n-grams of fingerprint as
+        # (n-gram score, file path, Fingerprint) tuples, and the time spent querying them
+        pass
+
+    def get_matching_items_batch(self, index, fingerprints, threshold):
+        # Stores that support batched queries override this
+        matching_items = list()
+        execution_time = 0
+        for fingerprint in fingerprints:
+            items, query_time = self.get_matching_items(index, fingerprint, threshold)
+            matching_items.append(items)
+            execution_time += query_time
+        return matching_items, execution_time
+
+def get_minimum_should_match(clauses, threshold):
+    # Number of clauses a document has to match for a minimum_should_match of threshold percent, rounded
+    # down in single precision like Elasticsearch does
+    return int(numpy.float32(clauses * int(threshold*100)) * numpy.float32(1 / 100))
+
+def get_matching_items_from_documents(fingerprint, documents):
+    scores = score_ngram_overlap(fingerprint, [document["fingerprint"] for document in documents], settings.NGRAM_SIZE)
+    matched_fingerprints = list()
+    for score, document in zip(scores, documents):
+        matched_fingerprints.append((score, document["file_path"], Fingerprint.from_document(document)))
+    return matched_fingerprints
+
+def get_backend(name=None):
+    if name is None:
+        name = settings.BACKEND
+    if name not in STORES:
+        if name not in BACKENDS:
+            raise ValueError("Unknown backend: "+str(name)+". Available backends: "+", ".join(BACKENDS))
+        module_name, class_name = BACKENDS[name]
+        STORES[name] = getattr(importlib.import_module(module_name), class_name)()
+    return STORES[name]
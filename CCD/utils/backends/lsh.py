@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import numpy
+
+from utils import settings
+from utils.utils import colors, generate_ngram_keys, count_ngram_matches
+from utils.backends import FingerprintStore, get_matching_items_from_documents, get_minimum_should_match
+
+# Version of the format of the persisted indexes
+LSH_INDEX_VERSION = 1
+
+# Seed of the hash functions simulating the permutations of MinHash
+MINHASH_SEED = 1
+
+# Signature of a fingerprint without any n-gram
+EMPTY_HASH = numpy.iinfo(numpy.uint64).max
+
+
+def mix(values):
+    # Finalizer of splitmix64, a bijective mixing of 64-bit integers that wraps around on overflow
+    values = (values ^ (values >> numpy.uint64(30))) * numpy.uint64(0xbf58476d1ce4e5b9)
+    values = (values ^ (values >> numpy.uint64(27))) * numpy.uint64(0x94d049bb133111eb)
+    return values ^ (values >> numpy.uint64(31))
+
+
+def get_permutation_seeds(permutations):
+    return numpy.random.default_rng(MINHASH_SEED).integers(0, EMPTY_HASH, size=permutations, dtype=numpy.uint64, endpoint=True)
+
+
+def get_minhash_signature(keys, seeds):
+    # Minimum of every hash function over the distinct n-grams of a fingerprint
+    if not len(keys):
+        return numpy.full(len(seeds), EMPTY_HASH, dtype=numpy.uint64)
+    return mix(numpy.unique(keys)[numpy.newaxis, :] ^ seeds[:, numpy.newaxis]).min(axis=1)
+
+
+def get_band_keys(signatures, bands, rows):
+    # Hashes the rows of every band of the signatures into a single key, which also depends on the band,
+    # so that the buckets of all bands can be kept in one sorted array
+    signatures = numpy.atleast_2d(signatures)
+    keys = numpy.repeat(numpy.arange(bands, dtype=numpy.uint64)[numpy.newaxis, :], len(signatures), axis=0)
+    for row in range(rows):
+        keys = mix(keys ^ signatures[:, row:bands*rows:rows])
+    return keys
+
+
+def get_lsh_parameters(threshold, permutations, false_negative_weight=None):
+    """
+    Returns the number of bands and rows per band that minimize the weighted probabilities of missing a fingerprint
+    above and of retrieving a fingerprint below the threshold. The threshold is the share of the n-grams of the query
+    that a match contains, which corresponds to a Jaccard similarity of threshold / (2 - threshold) if both fingerprints
+    have the same number of distinct n-grams.
+    """
+    if false_negative_weight is None:
+        false_negative_weight = settings.LSH_FALSE_NEGATIVE_WEIGHT
+    jaccard_threshold = threshold / (2 - threshold)
+    # Midpoints of equally wide steps below and above the threshold, to integrate over the similarities
+    below = (numpy.arange(100) + 0.5) / 100 * jaccard_threshold
+    above = jaccard_threshold + (numpy.arange(100) + 0.5) / 100 * (1 - jaccard_threshold)
+    best = None
+    for bands in range(1, permutations + 1):
+        for rows in range(1, permutations // bands + 1):
+            false_positives = numpy.mean(1 - (1 - below ** rows) ** bands) * jaccard_threshold
+            false_negatives = numpy.mean((1 - above ** rows) ** bands) * (1 - jaccard_threshold)
+            error = (1 - false_negative_weight) * false_positives + false_negative_weight * false_negatives
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class LSHIndex(object):
+    """
+    Locality-sensitive hashing index over the MinHash signatures of the n-gram sets of the fingerprints. Every band of
+    rows of a signature is hashed into a bucket and the fingerprints sharing a bucket with the query are the
+    candidates, which are then checked against the n-gram threshold. Documents with the same fingerprint form a group
+    that is hashed and checked only once.
+    """
+
+    def __init__(self, ngram_size=settings.NGRAM_SIZE, permutations=settings.LSH_PERMUTATIONS, bands=None, rows=None):
+        if bands is None or rows is None:
+            bands, rows = get_lsh_parameters(settings.NGRAM_THRESHOLD, permutations)
+        self.ngram_size = ngram_size
+        self.permutations = permutations
+        self.bands = bands
+        self.rows = rows
+        self.seeds = get_permutation_seeds(permutations)
+        self.ids = list()
+        self.documents = list()
+        self.numbers = dict()
+        # Group of every distinct fingerprint and the numbers of the documents of every group
+        self.groups = dict()
+        self.group_numbers = list()
+        self.signatures = numpy.empty((0, permutations), dtype=numpy.uint64)
+        # Distinct n-grams of every group, to check the candidates without tokenizing their fingerprints again
+        self.ngram_keys = list()
+        self.bucket_keys = numpy.empty(0, dtype=numpy.uint64)
+        self.bucket_groups = numpy.empty(0, dtype=numpy.int32)
+        # Signatures of the groups added since the buckets were last built
+        self.pending = list()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add_document(self, id, document, keys=None):
+        if id is None:
+            id = str(len(self.documents))
+        if id in self.numbers:
+            return False
+        self.numbers[id] = len(self.documents)
+        self.ids.append(id)
+        self.documents.append(document)
+        self.add_to_group(document["fingerprint"], keys)
+        return True
+
+    def add_to_group(self, fingerprint, keys=None):
+        group = self.groups.get(fingerprint)
+        if group is None:
+            group = self.groups[fingerprint] = len(self.group_numbers)
+            self.group_numbers.append(list())
+            # Groups of a loaded index come with their n-grams, their signatures are loaded with the index
+            if keys is None:
+                keys = numpy.unique(generate_ngram_keys(fingerprint, self.ngram_size))
+                self.pending.append(get_minhash_signature(keys, self.seeds))
+            self.ngram_keys.append(keys)
+        self.group_numbers[group].append(len(self.documents) - 1)
+
+    def get_document(self, id):
+        number = self.numbers.get(id)
+        return None if number is None else self.documents[number]
+
+    def build_buckets(self):
+        if self.pending:
+            self.signatures = numpy.concatenate([self.signatures, numpy.array(self.pending, dtype=numpy.uint64)])
+            self.pending = list()
+        if len(self.bucket_groups) == len(self.signatures) * self.bands:
+            return
+        keys = get_band_keys(self.signatures, self.bands, self.rows).ravel()
+        groups = numpy.repeat(numpy.arange(len(self.signatures), dtype=numpy.int32), self.bands)
+        order = numpy.argsort(keys, kind="stable")
+        self.bucket_keys, self.bucket_groups = keys[order], groups[order]
+
+    def get_bucket_groups(self, keys):
+        # Groups sharing at least one bucket with a fingerprint
+        self.build_buckets()
+        band_keys = get_band_keys(get_minhash_signature(keys, self.seeds), self.bands, self.rows)[0]
+        starts = numpy.searchsorted(self.bucket_keys, band_keys, side="left")
+        ends = numpy.searchsorted(self.bucket_keys, band_keys, side="right")
+        if not (ends - starts).any():
+            return numpy.empty(0, dtype=numpy.int32)
+        return numpy.unique(numpy.concatenate([self.bucket_groups[start:end] for start, end in zip(starts.tolist(), ends.tolist())]))
+
+    def get_candidates(self, fingerprint, threshold):
+        """
+        Returns the numbers of the documents that share a bucket with the fingerprint and contain the n-grams of
+        at least threshold of its n-grams, counted like the clauses of an Elasticsearch match query with
+        minimum_should_match. Candidates are ordered by their number of matching n-grams.
+        """
+        keys = generate_ngram_keys(fingerprint, self.ngram_size)
+        if not len(keys):
+            return list()
+        groups = self.get_bucket_groups(keys).tolist()
+        if not groups:
+            return list()
+        required = max(1, get_minimum_should_match(len(keys), threshold))
+        matches = count_ngram_matches(keys, [self.ngram_keys[group] for group in groups], distinct=True)
+        return [number for _, number in sorted([(-count, number) for count, group in zip(matches.tolist(), groups) if count >= required for number in self.group_numbers[group]])]
+
+    def save(self, path):
+        self.build_buckets()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        metadata = json.dumps({"version": LSH_INDEX_VERSION, "ngram_size": self.ngram_size, "permutations": self.permutations, "bands": self.bands, "rows": self.rows, "ids": self.ids, "documents": self.documents})
+        # Written to a temporary file first, so that concurrent readers never see a partial index
+        temporary_path = path+"."+str(os.getpid())
+        with open(temporary_path, "wb") as f:
+            numpy.savez(f, signatures=self.signatures, ngram_keys=numpy.concatenate([numpy.empty(0, dtype=numpy.uint64)] + self.ngram_keys), ngram_offsets=numpy.cumsum([len(keys) for keys in self.ngram_keys], dtype=numpy.int64), metadata=numpy.frombuffer(metadata.encode("utf-8"), dtype=numpy.uint8))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with numpy.load(path) as data:
+            metadata = json.loads(data["metadata"].tobytes().decode("utf-8"))
+            if metadata["version"] != LSH_INDEX_VERSION:
+                raise ValueError("Index "+path+" was saved in an unsupported format")
+            lsh_index = cls(metadata["ngram_size"], metadata["permutations"], metadata["bands"], metadata["rows"])
+            lsh_index.signatures = data["signatures"]
+            ngram_keys = numpy.split(data["ngram_keys"], data["ngram_offsets"][:-1])
+        # Groups are numbered in the order of their first document, as when they were added
+        for id, document in zip(metadata["ids"], metadata["documents"]):
+            lsh_index.add_document(id, document, ngram_keys[len(lsh_index.group_numbers)] if document["fingerprint"] not in lsh_index.groups else None)
+        # The buckets are rebuilt from the signatures
+        lsh_index.build_buckets()
+        return lsh_index
+
+
+def get_index_path(index):
+    return os.path.join(settings.INDEX_DIRECTORY, index+".lsh.npz")
+
+
+class LSHStore(FingerprintStore):
+    """
+    Retrieves candidates from an LSH index over MinHash signatures, which is saved to and loaded from
+    settings.INDEX_DIRECTORY. Unlike an n-gram query, retrieval does not scan the postings of every n-gram and
+    returns all matching candidates, at the cost of missing some of them.
+    """
+
+    def __init__(self):
+        self.indexes = dict()
+
+    def get_index(self, index):
+        if index not in self.indexes:
+            path = get_index_path(index)
+            if not os.path.isfile(path):
+                raise ValueError("Index "+index+" does not exist")
+            self.indexes[index] = LSHIndex.load(path)
+        return self.indexes[index]
+
+    def create_index(self, index, clear_index=False):
+        path = get_index_path(index)
+        if clear_index or not os.path.isfile(path):
+            self.indexes[index] = LSHIndex(bands=settings.LSH_BANDS, rows=settings.LSH_ROWS)
+            self.indexes[index].save(path)
+
+    def add_documents(self, documents, index, batch_size=settings.ELASTICSEARCH_BULK_SIZE):
+        lsh_index = self.get_index(index)
+        indexed, existing, failed = 0, 0, 0
+        for id, document in documents:
+            if lsh_index.add_document(id, document):
+                indexed += 1
+            else:
+                existing += 1
+        if settings.DEBUG_MODE and existing:
+            print(colors.INFO+"[LSH] "+str(existing)+" document(s) already exist!"+colors.END)
+        # Saved only once after all documents have been added
+        lsh_index.save(get_index_path(index))
+        return indexed, existing, failed
+
+    def get_existing_document_ids(self, ids, index):
+        lsh_index = self.get_index(index)
+        return {id for id in ids if id in lsh_index.numbers}
+
+    def get_document(self, id, index):
+        return self.get_index(index).get_document(id)
+
+    def get_matching_items(self, index, fingerprint, threshold):
+        lsh_index = self.get_index(index)
+        timer_start = time.time()
+        candidates = lsh_index.get_candidates(fingerprint, threshold)
+        timer_end = time.time()
+        return get_matching_items_from_documents(fingerprint, [lsh_index.documents[number] for number in candidates]), timer_end - timer_start
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import mmap
+import time
+import numpy
+import struct
+
+from utils import settings
+from utils.utils import colors
+from utils.fingerprint import Fingerprint
+from utils.backends import FingerprintStore, get_matching_items_from_documents
+from utils.backends.memory import InvertedIndex, get_candidate_numbers
+
+MAPPED_INDEX_MAGIC = b"CCDINDEX"
+# Version of the format of the index files
+MAPPED_INDEX_VERSION = 1
+
+# Header: magic, version, n-gram size, number of documents, number of distinct n-grams and number of postings
+HEADER = struct.Struct("<8sIIQQQ")
+
+# The header is followed by the offsets of the sections in the file, every section starts at a multiple of 8 bytes.
+# String tables hold one string per document: the offsets of the strings followed by their UTF-8 bytes.
+STRING_TABLES = ("ids", "file_paths", "fingerprints", "documents")
+ARRAYS = (("terms", "<u8"), ("offsets", "<u8"), ("postings", "<i4"))
+SECTIONS = STRING_TABLES + tuple(name for name, _ in ARRAYS)
+SECTION_TABLE = struct.Struct("<"+"Q"*len(SECTIONS))
+
+# Fields of a document that are stored in sections of their own instead of the documents string table
+PACKED_FIELDS = ("file_path", "fingerprint", "fingerprint_contracts")
+
+
+def pack_strings(strings):
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = numpy.zeros(len(encoded) + 1, dtype="<u8")
+    numpy.cumsum([len(string) for string in encoded], out=offsets[1:])
+    return offsets.tobytes() + b"".join(encoded)
+
+
+def write_mapped_index(path, inverted_index):
+    inverted_index.build_postings()
+    documents = inverted_index.documents
+    sections = [
+        pack_strings(inverted_index.ids),
+        pack_strings([document["file_path"] for document in documents]),
+        pack_strings([document["fingerprint"] for document in documents]),
+        pack_strings([json.dumps({key: value for key, value in document.items() if key not in PACKED_FIELDS}) for document in documents]),
+        inverted_index.terms.astype("<u8").tobytes(),
+        inverted_index.offsets.astype("<u8").tobytes(),
+        inverted_index.postings.astype("<i4").tobytes()
+    ]
+    header = HEADER.pack(MAPPED_INDEX_MAGIC, MAPPED_INDEX_VERSION, inverted_index.ngram_size, len(documents), len(inverted_index.terms), len(inverted_index.postings))
+    position = len(header) + SECTION_TABLE.size
+    offsets = list()
+    for section in sections:
+        position += -position % 8
+        offsets.append(position)
+        position += len(section)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Written to a temporary file first. Matchers that mapped the previous file keep reading it until they reopen the index.
+    temporary_path = path+"."+str(os.getpid())
+    with open(temporary_path, "wb") as f:
+        f.write(header)
+        f.write(SECTION_TABLE.pack(*offsets))
+        for offset, section in zip(offsets, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(section)
+    os.replace(temporary_path, path)
+
+
+class MappedIndex(object):
+    """
+    Read-only view of an index file mapped into memory. The n-grams and postings are used in place and strings
+    are only decoded for the candidates of a query, so that opening an index does not depend on its size and
+    processes mapping the same file share its pages.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.ngram_size, self.document_count, term_count, posting_count = HEADER.unpack_from(self.map, 0)
+        if magic != MAPPED_INDEX_MAGIC or version != MAPPED_INDEX_VERSION:
+            raise ValueError("Index "+path+" was saved in an unsupported format")
+        sections = dict(zip(SECTIONS, SECTION_TABLE.unpack_from(self.map, HEADER.size)))
+        lengths = {"terms": term_count, "offsets": term_count + 1, "postings": posting_count}
+        for name, dtype in ARRAYS:
+            setattr(self, name, numpy.frombuffer(self.map, dtype=dtype, count=lengths[name], offset=sections[name]))
+        self.string_tables = dict()
+        for name in STRING_TABLES:
+            offsets = numpy.frombuffer(self.map, dtype="<u8", count=self.document_count + 1, offset=sections[name])
+            self.string_tables[name] = (offsets, sections[name] + offsets.nbytes)
+        self.numbers = None
+
+    def __len__(self):
+        return self.document_count
+
+    def get_string(self, table, number):
+        return self.get_strings(table, [number])[0]
+
+    def get_strings(self, table, numbers):
+        offsets, start = self.string_tables[table]
+        numbers = numpy.asarray(numbers, dtype=numpy.int64)
+        return [self.map[start+begin:start+end].decode("utf-8") for begin, end in zip(offsets[numbers].tolist(), offsets[numbers + 1].tolist())]
+
+    def get_number(self, id):
+        # The ids are only read when documents are looked up by id, which matching does not need
+        if self.numbers is None:
+            self.numbers = {id: number for number, id in enumerate(self.get_strings("ids", range(self.document_count)))}
+        return self.numbers.get(id)
+
+    def get_document(self, number):
+        document = json.loads(self.get_string("documents", number))
+        document["file_path"] = self.get_string("file_paths", number)
+        document["fingerprint"] = self.get_string("fingerprints", number)
+        document["fingerprint_contracts"] = Fingerprint.from_text(document["fingerprint"]).contracts
+        return document
+
+    def get_candidates(self, fingerprint, threshold, size=settings.ELASTICSEARCH_MAX_RESULTS):
+        numbers = get_candidate_numbers(fingerprint, threshold, self.ngram_size, self.terms, self.offsets, self.postings, self.document_count, size)
+        return [{"file_path": file_path, "fingerprint": fingerprint} for file_path, fingerprint in zip(self.get_strings("file_paths", numbers), self.get_strings("fingerprints", numbers))]
+
+
+def get_index_path(index):
+    return os.path.join(settings.INDEX_DIRECTORY, index+".idx")
+
+
+class MappedStore(FingerprintStore):
+    """
+    Keeps every index in an immutable file in settings.INDEX_DIRECTORY that matchers map into memory. Adding
+    documents writes a new file with the documents of the previous one.
+    """
+
+    def __init__(self):
+        self.indexes = dict()
+
+    def get_index(self, index):
+        if index not in self.indexes:
+            path = get_index_path(index)
+            if not os.path.isfile(path):
+                raise ValueError("Index "+index+" does not exist")
+            self.indexes[index] = MappedIndex(path)
+        return self.indexes[index]
+
+    def create_index(self, index, clear_index=False):
+        path = get_index_path(index)
+        if clear_index or not os.path.isfile(path):
+            write_mapped_index(path, InvertedIndex())
+            self.indexes.pop(index, None)
+
+    def add_documents(self, documents, index, batch_size=settings.ELASTICSEARCH_BULK_SIZE):
+        mapped_index = self.get_index(index)
+        inverted_index = InvertedIndex(mapped_index.ngram_size)
+        for number in range(len(mapped_index)):
+            inverted_index.add_document(mapped_index.get_string("ids", number), mapped_index.get_document(number))
+        indexed, existing, failed = 0, 0, 0
+        for id, document in documents:
+            if inverted_index.add_document(id, document):
+                indexed += 1
+            else:
+                existing += 1
+        if settings.DEBUG_MODE and existing:
+            print(colors.INFO+"[Mapped] "+str(existing)+" document(s) already exist!"+colors.END)
+        if indexed:
+            write_mapped_index(get_index_path(index), inverted_index)
+            self.indexes.pop(index, None)
+        return indexed, existing, failed
+
+    def get_existing_document_ids(self, ids, index):
+        mapped_index = self.get_index(index)
+        return {id for id in ids if mapped_index.get_number(id) is not None}
+
+    def get_document(self, id, index):
+        mapped_index = self.get_index(index)
+        number = mapped_index.get_number(id)
+        return None if number is None else mapped_index.get_document(number)
+
+    def get_matching_items(self, index, fingerprint, threshold):
+        mapped_index = self.get_index(index)
+        timer_start = time.time()
+        candidates = mapped_index.get_candidates(fingerprint, threshold)
+        timer_end = time.time()
+        return get_matching_items_from_documents(fingerprint, candidates), timer_end - timer_start
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import numpy
+
+from utils import settings
+from utils.utils import colors, generate_ngram_keys
+from utils.backends import FingerprintStore, get_matching_items_from_documents, get_minimum_should_match
+
+# Version of the format of the persisted indexes
+MEMORY_INDEX_VERSION = 1
+
+
+def get_candidate_numbers(fingerprint, threshold, ngram_size, terms, offsets, postings, document_count, size=settings.ELASTICSEARCH_MAX_RESULTS):
+    """
+    Returns the numbers of the documents matching the fingerprint like an Elasticsearch match query with
+    minimum_should_match: every n-gram of the fingerprint is a clause, repeated n-grams included, and a
+    document matches if it contains the n-grams of enough clauses. Candidates are ordered by their number
+    of matching clauses.
+    """
+    keys = generate_ngram_keys(fingerprint, ngram_size)
+    if not len(keys) or not len(terms):
+        return list()
+    required = max(1, get_minimum_should_match(len(keys), threshold))
+    query_terms, counts = numpy.unique(keys, return_counts=True)
+    positions = numpy.minimum(numpy.searchsorted(terms, query_terms), len(terms) - 1)
+    found = terms[positions] == query_terms
+    positions, counts = positions[found], counts[found]
+    starts, ends, counts = offsets[positions].tolist(), offsets[positions + 1].tolist(), counts.tolist()
+    # N-grams occurring the same number of times in the fingerprint are counted together, most occur once
+    scores = numpy.zeros(document_count, dtype=numpy.int64)
+    for count in set(counts):
+        matches = numpy.concatenate([postings[start:end] for start, end, c in zip(starts, ends, counts) if c == count])
+        scores += count * numpy.bincount(matches, minlength=document_count)
+    candidates = numpy.flatnonzero(scores >= required)
+    order = numpy.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:size]].tolist()
+
+
+class InvertedIndex(object):
+    """
+    Inverted index from the n-grams of the fingerprints to the numbers of the documents containing them.
+    The postings of all n-grams are kept in a single integer array, ordered by n-gram, with offsets giving
+    where the postings of every n-gram start.
+    """
+
+    def __init__(self, ngram_size=settings.NGRAM_SIZE):
+        # Like the tokenizer of an Elasticsearch index, the n-gram size is fixed when the index is created
+        self.ngram_size = ngram_size
+        self.ids = list()
+        self.documents = list()
+        self.numbers = dict()
+        self.terms = numpy.empty(0, dtype=numpy.uint64)
+        self.offsets = numpy.zeros(1, dtype=numpy.int64)
+        self.postings = numpy.empty(0, dtype=numpy.int32)
+        # Distinct n-grams of the documents added since the postings were last built
+        self.pending = list()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add_document(self, id, document):
+        if id is None:
+            id = str(len(self.documents))
+        if id in self.numbers:
+            return False
+        self.numbers[id] = len(self.documents)
+        self.ids.append(id)
+        self.documents.append(document)
+        self.pending.append(numpy.unique(generate_ngram_keys(document["fingerprint"], self.ngram_size)))
+        return True
+
+    def get_document(self, id):
+        number = self.numbers.get(id)
+        return None if number is None else self.documents[number]
+
+    def build_postings(self):
+        # Merges the n-grams of the pending documents into the postings, which stay ordered by n-gram
+        # and, within an n-gram, by document number
+        if not self.pending:
+            return
+        first = len(self.documents) - len(self.pending)
+        lengths = numpy.diff(self.offsets)
+        terms = numpy.concatenate([numpy.repeat(self.terms, lengths)] + self.pending)
+        postings = numpy.concatenate([self.postings, numpy.repeat(numpy.arange(first, len(self.documents), dtype=numpy.int32), [len(keys) for keys in self.pending])])
+        order = numpy.argsort(terms, kind="stable")
+        terms, postings = terms[order], postings[order]
+        self.terms, starts = numpy.unique(terms, return_index=True)
+        self.offsets = numpy.append(starts, len(terms)).astype(numpy.int64)
+        self.postings = postings
+        self.pending = list()
+
+    def get_candidates(self, fingerprint, threshold, size=settings.ELASTICSEARCH_MAX_RESULTS):
+        self.build_postings()
+        return get_candidate_numbers(fingerprint, threshold, self.ngram_size, self.terms, self.offsets, self.postings, len(self.documents), size)
+
+    def save(self, path):
+        self.build_postings()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        metadata = json.dumps({"version": MEMORY_INDEX_VERSION, "ngram_size": self.ngram_size, "ids": self.ids, "documents": self.documents})
+        # Written to a temporary file first, so that concurrent readers never see a partial index
+        temporary_path = path+"."+str(os.getpid())
+        with open(temporary_path, "wb") as f:
+            numpy.savez(f, terms=self.terms, offsets=self.offsets, postings=self.postings, metadata=numpy.frombuffer(metadata.encode("utf-8"), dtype=numpy.uint8))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with numpy.load(path) as data:
+            metadata = json.loads(data["metadata"].tobytes().decode("utf-8"))
+            if metadata["version"] != MEMORY_INDEX_VERSION:
+                raise ValueError("Index "+path+" was saved in an unsupported format")
+            inverted_index = cls(metadata["ngram_size"])
+            inverted_index.terms = data["terms"]
+            inverted_index.offsets = data["offsets"]
+            inverted_index.postings = data["postings"]
+        inverted_index.ids = metadata["ids"]
+        inverted_index.documents = metadata["documents"]
+        inverted_index.numbers = {id: number for number, id in enumerate(inverted_index.ids)}
+        return inverted_index
+
+
+def get_index_path(index):
+    return os.path.join(settings.INDEX_DIRECTORY, index+".npz")
+
+
+class MemoryStore(FingerprintStore):
+    """
+    Keeps the fingerprints in an inverted n-gram index in memory, which is saved to and loaded from
+    settings.INDEX_DIRECTORY, so that no search server is required
+    """
+
+    def __init__(self):
+        self.indexes = dict()
+
+    def get_index(self, index):
+        if index not in self.indexes:
+            path = get_index_path(index)
+            if not os.path.isfile(path):
+                raise ValueError("Index "+index+" does not exist")
+            self.indexes[index] = InvertedIndex.load(path)
+        return self.indexes[index]
+
+    def create_index(self, index, clear_index=False):
+        path = get_index_path(index)
+        if clear_index or not os.path.isfile(path):
+            self.indexes[index] = InvertedIndex()
+            self.indexes[index].save(path)
+
+    def add_documents(self, documents, index, batch_size=settings.ELASTICSEARCH_BULK_SIZE):
+        inverted_index = self.get_index(index)
+        indexed, existing, failed = 0, 0, 0
+        for id, document in documents:
+            if inverted_index.add_document(id, document):
+                indexed += 1
+            else:
+                existing += 1
+        if settings.DEBUG_MODE and existing:
+            print(colors.INFO+"[Memory] "+str(existing)+" document(s) already exist!"+colors.END)
+        # Saved only once after all documents have been added
+        inverted_index.save(get_index_path(index))
+        return indexed, existing, failed
+
+    def get_existing_document_ids(self, ids, index):
+        inverted_index = self.get_index(index)
+        return {id for id in ids if id in inverted_index.numbers}
+
+    def get_document(self, id, index):
+        return self.get_index(index).get_document(id)
+
+    def get_matching_items(self, index, fingerprint, threshold):
+        inverted_index = self.get_index(index)
+        timer_start = time.time()
+        candidates = inverted_index.get_candidates(fingerprint, threshold)
+        timer_end = time.time()
+        return get_matching_items_from_documents(fingerprint, [inverted_index.documents[number] for number in candidates]), timer_end - timer_start
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import numpy
+import sqlite3
+import threading
+
+from utils import settings
+from utils.utils import colors, generate_ngram_keys, count_ngram_matches
+from utils.backends import FingerprintStore, get_matching_items_from_documents, get_minimum_should_match
+
+# The trigram tokenizer of FTS5 always splits the fingerprints into n-grams of three characters
+SQLITE_NGRAM_SIZE = 3
+
+# Connection of the current thread
+LOCAL = threading.local()
+
+def get_connection():
+    # Every thread and (forked) process needs its own connection
+    if getattr(LOCAL, "connection", None) is None or LOCAL.pid != os.getpid():
+        directory = os.path.dirname(settings.SQLITE_INDEX_FILE)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        LOCAL.connection = sqlite3.connect(settings.SQLITE_INDEX_FILE, timeout=settings.SQLITE_TIMEOUT, isolation_level=None)
+        # Readers do not block the writer and concurrent writers wait for each other
+        LOCAL.connection.execute("PRAGMA journal_mode=WAL")
+        LOCAL.connection.execute("PRAGMA synchronous=NORMAL")
+        LOCAL.pid = os.getpid()
+    return LOCAL.connection
+
+def quote_identifier(name):
+    return '"'+name.replace('"', '""')+'"'
+
+def get_table_names(index):
+    # Documents of an index and the FTS5 index of their fingerprints
+    return quote_identifier(index), quote_identifier(index+"_fingerprints")
+
+def get_match_expression(ngrams):
+    # Matches the documents containing any of the n-grams, every n-gram is quoted as a phrase
+    return " OR ".join(['"'+ngram.replace('"', '""')+'"' for ngram in ngrams])
+
+def check_ngram_size():
+    if settings.NGRAM_SIZE != SQLITE_NGRAM_SIZE:
+        raise ValueError("The sqlite backend only supports an n-gram size of "+str(SQLITE_NGRAM_SIZE)+", not "+str(settings.NGRAM_SIZE))
+
+class SQLiteStore(FingerprintStore):
+    """
+    Stores the fingerprints in a single SQLite file, with an FTS5 trigram index over the fingerprints for
+    retrieving candidates, so that no search server is required
+    """
+
+    def create_index(self, index, clear_index=False):
+        check_ngram_size()
+        connection = get_connection()
+        documents, fingerprints = get_table_names(index)
+        if clear_index:
+            connection.execute("DROP TABLE IF EXISTS "+fingerprints)
+            connection.execute("DROP TABLE IF EXISTS "+documents)
+        # The distinct n-grams of every fingerprint are kept as a blob of sorted keys to count the matching
+        # n-grams of the candidates without tokenizing their fingerprints again
+        connection.execute("CREATE TABLE IF NOT EXISTS "+documents+" (number INTEGER PRIMARY KEY, id TEXT UNIQUE, file_path TEXT, fingerprint TEXT NOT NULL, ngrams BLOB NOT NULL, document TEXT NOT NULL)")
+        connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS "+fingerprints+" USING fts5(fingerprint, content="+documents+", content_rowid=number, tokenize='trigram case_sensitive 1', detail=none)")
+
+    def add_documents(self, documents, index, batch_size=settings.ELASTICSEARCH_BULK_SIZE):
+        indexed, existing, failed = 0, 0, 0
+        batch = list()
+        batch_number = 0
+        for id, document in documents:
+            batch.append((id, document))
+            if len(batch) >= batch_size:
+                batch_number += 1
+                batch_indexed, batch_existing, batch_failed = self.add_batch(batch, index, batch_number)
+                indexed, existing, failed = indexed + batch_indexed, existing + batch_existing, failed + batch_failed
+                batch = list()
+        if batch:
+            batch_number += 1
+            batch_indexed, batch_existing, batch_failed = self.add_batch(batch, index, batch_number)
+            indexed, existing, failed = indexed + batch_indexed, existing + batch_existing, failed + batch_failed
+        return indexed, existing, failed
+
+    def add_batch(self, batch, index, batch_number):
+        connection = get_connection()
+        documents, fingerprints = get_table_names(index)
+        indexed, existing = 0, 0
+        try:
+            # Every batch is written in a single transaction
+            connection.execute("BEGIN IMMEDIATE")
+            for id, document in batch:
+                ngrams = numpy.unique(generate_ngram_keys(document["fingerprint"], SQLITE_NGRAM_SIZE)).tobytes()
+                cursor = connection.execute("INSERT OR IGNORE INTO "+documents+" (id, file_path, fingerprint, ngrams, document) VALUES (?, ?, ?, ?, ?)", (id, document["file_path"], document["fingerprint"], ngrams, json.dumps(document)))
+                if cursor.rowcount == 0:
+                    existing += 1
+                    continue
+                connection.execute("INSERT INTO "+fingerprints+" (rowid, fingerprint) VALUES (?, ?)", (cursor.lastrowid, document["fingerprint"]))
+                indexed += 1
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            print(colors.FAIL+"[SQLite] Error: batch "+str(batch_number)+" failed: "+str(e)+colors.END)
+            return 0, 0, len(batch)
+        if settings.DEBUG_MODE and existing:
+            print(colors.INFO+"[SQLite] Batch "+str(batch_number)+": "+str(existing)+" document(s) already exist!"+colors.END)
+        return indexed, existing, 0
+
+    def get_existing_document_ids(self, ids, index, batch_size=settings.ELASTICSEARCH_MGET_SIZE):
+        connection = get_connection()
+        documents, _ = get_table_names(index)
+        existing_ids = set()
+        for i in range(0, len(ids), batch_size):
+            rows = connection.execute("SELECT id FROM "+documents+" WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(ids[i:i+batch_size]), ))
+            existing_ids.update([row[0] for row in rows])
+        return existing_ids
+
+    def get_document(self, id, index):
+        documents, _ = get_table_names(index)
+        row = get_connection().execute("SELECT document FROM "+documents+" WHERE id = ?", (id, )).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def get_candidates(self, index, fingerprint, threshold, size=settings.ELASTICSEARCH_MAX_RESULTS):
+        """
+        Returns the documents matching the fingerprint like an Elasticsearch match query with minimum_should_match.
+        The FTS5 index returns the documents sharing any n-gram with the fingerprint, for which the matching
+        n-grams are then counted. Candidates are ordered by their number of matching n-grams.
+        """
+        connection = get_connection()
+        documents, fingerprints = get_table_names(index)
+        keys = generate_ngram_keys(fingerprint, SQLITE_NGRAM_SIZE)
+        if not len(keys):
+            return list()
+        required = max(1, get_minimum_should_match(len(keys), threshold))
+        ngrams = {fingerprint[i:i+SQLITE_NGRAM_SIZE] for i in range(len(keys))}
+        rows = connection.execute("SELECT number, ngrams FROM "+documents+" WHERE number IN (SELECT rowid FROM "+fingerprints+" WHERE "+fingerprints+" MATCH ?)", (get_match_expression(ngrams), )).fetchall()
+        if not rows:
+            return list()
+        matches = count_ngram_matches(keys, [numpy.frombuffer(row[1], dtype=numpy.uint64) for row in rows], distinct=True)
+        candidates = sorted([(-count, row[0]) for count, row in zip(matches.tolist(), rows) if count >= required])[:size]
+        numbers = [number for _, number in candidates]
+        results = {number: document for number, document in connection.execute("SELECT number, document FROM "+documents+" WHERE number IN (SELECT value FROM json_each(?))", (json.dumps(numbers), ))}
+        return [json.loads(results[number]) for number in numbers]
+
+    def get_matching_items(self, index, fingerprint, threshold):
+        timer_start = time.time()
+        candidates = self.get_candidates(index, fingerprint, threshold)
+        timer_end = time.time()
+        return get_matching_items_from_documents(fingerprint, candidates), timer_end - timer_start
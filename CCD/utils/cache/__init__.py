@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from utils import settings
+from utils.utils import colors
+from utils.fingerprint import FINGERPRINT_VERSION
+
+# Fields of a fingerprint result that depend on the fingerprinted file and not on its source code
+FILE_FIELDS = ("file_name", "file_path", "execution_time")
+
+# Connection of the current thread
+LOCAL = threading.local()
+
+global INSERTIONS
+INSERTIONS = 0
+
+def get_connection():
+    # Every thread and (forked) process needs its own connection
+    if getattr(LOCAL, "connection", None) is None or LOCAL.pid != os.getpid():
+        directory = os.path.dirname(settings.FINGERPRINT_CACHE_FILE)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        LOCAL.connection = sqlite3.connect(settings.FINGERPRINT_CACHE_FILE, timeout=settings.FINGERPRINT_CACHE_TIMEOUT, isolation_level=None)
+        LOCAL.connection.execute("PRAGMA journal_mode=WAL")
+        LOCAL.connection.execute("PRAGMA synchronous=NORMAL")
+        LOCAL.connection.execute("CREATE TABLE IF NOT EXISTS fingerprints (key TEXT PRIMARY KEY, result TEXT NOT NULL, last_access REAL NOT NULL)")
+        LOCAL.connection.execute("CREATE INDEX IF NOT EXISTS fingerprints_last_access ON fingerprints (last_access)")
+        LOCAL.pid = os.getpid()
+    return LOCAL.connection
+
+def get_cache_key(source_code):
+    # The fingerprint only depends on the raw source code, the version of the fingerprint format and whether
+    # syntax errors are recovered from
+    version = str(FINGERPRINT_VERSION)+(":strict" if settings.STRICT_PARSING else "")
+    return hashlib.sha256((version+":"+source_code).encode("utf-8", "surrogatepass")).hexdigest()
+
+def get_cached_fingerprint(key):
+    try:
+        connection = get_connection()
+        row = connection.execute("SELECT result FROM fingerprints WHERE key = ?", (key, )).fetchone()
+        if row is None:
+            return None
+        connection.execute("UPDATE fingerprints SET last_access = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+    except sqlite3.Error as e:
+        print(colors.FAIL+"[Cache] Error: "+str(e)+colors.END)
+        return None
+
+def store_cached_fingerprint(key, result):
+    global INSERTIONS
+
+    try:
+        connection = get_connection()
+        cached_result = {k: v for k, v in result.items() if k not in FILE_FIELDS}
+        connection.execute("INSERT OR REPLACE INTO fingerprints (key, result, last_access) VALUES (?, ?, ?)", (key, json.dumps(cached_result), time.time()))
+        INSERTIONS += 1
+        if INSERTIONS % settings.FINGERPRINT_CACHE_EVICTION_INTERVAL == 0:
+            evict_cached_fingerprints()
+    except sqlite3.Error as e:
+        print(colors.FAIL+"[Cache] Error: "+str(e)+colors.END)
+
+def evict_cached_fingerprints():
+    # Removes the least recently used fingerprints until the cache is back to 90% of its maximum size
+    connection = get_connection()
+    entries = connection.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+    if entries > settings.FINGERPRINT_CACHE_MAX_ENTRIES:
+        excess = entries - int(settings.FINGERPRINT_CACHE_MAX_ENTRIES * 0.9)
+        connection.execute("DELETE FROM fingerprints WHERE key IN (SELECT key FROM fingerprints ORDER BY last_access LIMIT ?)", (excess, ))
+        if settings.DEBUG_MODE:
+            print("Evicted", colors.INFO+str(excess)+colors.END, "fingerprint(s) from the cache.")
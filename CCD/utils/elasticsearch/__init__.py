@@ -4,12 +4,39 @@
 import time
 import json
 import elasticsearch
+import elasticsearch.helpers
 
 from utils import settings
-from utils.utils import colors, generate_ngrams
+from utils.utils import colors
+from utils.backends import FingerprintStore, get_matching_items_from_documents
+
+# Clients are kept per process and reused for all requests of that process
+global CLIENTS
+CLIENTS = dict()
+
+CLIENT_OPTIONS = {
+    "default": {},
+    "match": {"timeout": 600, "max_retries": 1, "retry_on_timeout": True}
+}
+
+def init_client(name="default"):
+    options = {"timeout": settings.ELASTICSEARCH_TIMEOUT}
+    options.update(CLIENT_OPTIONS[name])
+    CLIENTS[name] = elasticsearch.Elasticsearch(
+        [settings.ELASTICSEARCH_HOST+":"+str(settings.ELASTICSEARCH_PORT)],
+        maxsize=settings.ELASTICSEARCH_POOL_SIZE,
+        http_compress=settings.ELASTICSEARCH_HTTP_COMPRESS,
+        headers={"Connection": "keep-alive" if settings.ELASTICSEARCH_KEEP_ALIVE else "close"},
+        **options)
+    return CLIENTS[name]
+
+def get_client(name="default"):
+    if name not in CLIENTS:
+        return init_client(name)
+    return CLIENTS[name]
 
 def load_database_mapping(index, mapping_file=settings.ELASTICSEARCH_MAPPING, clear_index=False):
-    es = elasticsearch.Elasticsearch([settings.ELASTICSEARCH_HOST+":"+str(settings.ELASTICSEARCH_PORT)], timeout=settings.ELASTICSEARCH_TIMEOUT)
+    es = get_client()
     if es.indices.exists(index=index) and clear_index:
         es.indices.delete(index=index)
     if not es.indices.exists(index=index):
@@ -19,29 +46,60 @@ def load_database_mapping(index, mapping_file=settings.ELASTICSEARCH_MAPPING, cl
             mapping["settings"]["analysis"]["tokenizer"]["fingerprint_tokenizer"]["max_gram"] = settings.NGRAM_SIZE
             es.indices.create(index=index, body=mapping)
 
-def add_document_to_index(document, index, id=None):
-    es = elasticsearch.Elasticsearch([settings.ELASTICSEARCH_HOST+":"+str(settings.ELASTICSEARCH_PORT)], timeout=settings.ELASTICSEARCH_TIMEOUT)
-    try:
+def add_documents_to_index(documents, index, batch_size=settings.ELASTICSEARCH_BULK_SIZE):
+    es = get_client()
+    indexed, existing, failed = 0, 0, 0
+    batch = list()
+    batch_number = 0
+    for id, document in documents:
+        action = {"_op_type": "create", "_index": index, "_source": document}
         if id:
-            es.index(index=index, document=document, op_type="create", id=id)
-        else:
-            es.index(index=index, document=document, op_type="create")
-    except elasticsearch.exceptions.ConflictError:
-        print(colors.INFO+"[Elasticsearch] Error: document already exists! ", id, colors.END)
-    es.indices.refresh(index)
+            action["_id"] = id
+        batch.append(action)
+        if len(batch) >= batch_size:
+            batch_number += 1
+            batch_indexed, batch_existing, batch_failed = send_bulk_request(es, batch, batch_number)
+            indexed, existing, failed = indexed + batch_indexed, existing + batch_existing, failed + batch_failed
+            batch = list()
+    if batch:
+        batch_number += 1
+        batch_indexed, batch_existing, batch_failed = send_bulk_request(es, batch, batch_number)
+        indexed, existing, failed = indexed + batch_indexed, existing + batch_existing, failed + batch_failed
+    # Refresh only once after all batches have been sent
+    es.indices.refresh(index=index)
+    return indexed, existing, failed
 
-def get_document_by_id(id, index):
-    es = elasticsearch.Elasticsearch([settings.ELASTICSEARCH_HOST+":"+str(settings.ELASTICSEARCH_PORT)], timeout=settings.ELASTICSEARCH_TIMEOUT)
-    query = {
-        "query": {
-            "match":{
-               "_id":{
-                  "query": id
-                }
-            }
-        }
-    }
-    return es.search(body=query, index=index)
+def send_bulk_request(es, batch, batch_number):
+    try:
+        indexed, errors = elasticsearch.helpers.bulk(es, batch, raise_on_error=False)
+    except elasticsearch.exceptions.TransportError as e:
+        print(colors.FAIL+"[Elasticsearch] Error: bulk request for batch "+str(batch_number)+" failed: "+str(e)+colors.END)
+        return 0, 0, len(batch)
+    existing = [error for error in errors if error["create"]["status"] == 409]
+    failures = [error for error in errors if error["create"]["status"] != 409]
+    if settings.DEBUG_MODE and existing:
+        print(colors.INFO+"[Elasticsearch] Batch "+str(batch_number)+": "+str(len(existing))+" document(s) already exist!"+colors.END)
+    if failures:
+        print(colors.FAIL+"[Elasticsearch] Error: batch "+str(batch_number)+": "+str(len(failures))+" of "+str(len(batch))+" document(s) failed to index!"+colors.END)
+        for failure in failures:
+            print(colors.FAIL+"[Elasticsearch] Error:", failure["create"].get("_id"), failure["create"].get("error"), colors.END)
+    return indexed, len(existing), len(failures)
+
+def get_existing_document_ids(ids, index, batch_size=settings.ELASTICSEARCH_MGET_SIZE):
+    es = get_client()
+    existing_ids = set()
+    for i in range(0, len(ids), batch_size):
+        results = es.mget(body={"ids": ids[i:i+batch_size]}, index=index, _source=False)
+        for document in results["docs"]:
+            if document.get("found"):
+                existing_ids.add(document["_id"])
+    return existing_ids
+
+def get_document(id, index):
+    es = get_client()
+    results = es.search(body={"query": {"ids": {"values": [id]}}}, index=index, size=1)
+    hits = results["hits"]["hits"]
+    return hits[0]["_source"] if hits else None
 
 """def get_document_by_errors(index):
     es = elasticsearch.Elasticsearch([settings.ELASTICSEARCH_HOST+":"+str(settings.ELASTICSEARCH_PORT)], timeout=settings.ELASTICSEARCH_TIMEOUT)
@@ -65,10 +123,8 @@ def get_document_by_id(id, index):
     pprint.pprint(erros)
     return None"""
 
-def get_matching_items_for_fingerprint(index, fingerprint, threshold):
-    fingerprint_ngrams = generate_ngrams(fingerprint, settings.NGRAM_SIZE)
-    es = elasticsearch.Elasticsearch([settings.ELASTICSEARCH_HOST+":"+str(settings.ELASTICSEARCH_PORT)], timeout=600, max_retries=1, retry_on_timeout=True)
-    query = {
+def get_fingerprint_query(fingerprint, threshold):
+    return {
         "query": {
             "match":{
                "fingerprint":{
@@ -78,16 +134,58 @@ def get_matching_items_for_fingerprint(index, fingerprint, threshold):
             }
         }
     }
+
+def get_matching_items_from_hits(fingerprint, hits):
+    return get_matching_items_from_documents(fingerprint, [record["_source"] for record in hits])
+
+def get_matching_items_for_fingerprint(index, fingerprint, threshold):
+    es = get_client("match")
+    query = get_fingerprint_query(fingerprint, threshold)
     timer_start = time.time()
     results = es.search(body=query, index=index, size=settings.ELASTICSEARCH_MAX_RESULTS)
     timer_end = time.time()
-    matched_fingerprints = list()
-    for record in results["hits"]["hits"]:
-        record_ngrams = generate_ngrams(record["_source"]["fingerprint"], settings.NGRAM_SIZE)
-        ngram_match = 0
-        for ngram in fingerprint_ngrams:
-            if ngram in record_ngrams:
-                ngram_match += 1
-        score = ngram_match / len(fingerprint_ngrams) * 100.0
-        matched_fingerprints.append((score, record["_source"]["file_path"], record["_source"]["fingerprint"]))
-    return matched_fingerprints, timer_end - timer_start
+    return get_matching_items_from_hits(fingerprint, results["hits"]["hits"]), timer_end - timer_start
+
+def get_matching_items_for_fingerprints(index, fingerprints, threshold):
+    # Sends the queries of several fingerprints within a single multi-search request
+    es = get_client("match")
+    body = list()
+    for fingerprint in fingerprints:
+        query = get_fingerprint_query(fingerprint, threshold)
+        query["size"] = settings.ELASTICSEARCH_MAX_RESULTS
+        body.append({"index": index})
+        body.append(query)
+    timer_start = time.time()
+    results = es.msearch(body=body, index=index)
+    timer_end = time.time()
+    matching_items = list()
+    for fingerprint, response in zip(fingerprints, results["responses"]):
+        if "error" in response:
+            print(colors.FAIL+"[Elasticsearch] Error:", response["error"], colors.END)
+            matching_items.append(list())
+        else:
+            matching_items.append(get_matching_items_from_hits(fingerprint, response["hits"]["hits"]))
+    return matching_items, timer_end - timer_start
+
+class ElasticsearchStore(FingerprintStore):
+    """
+    Stores fingerprints in an Elasticsearch cluster, which matches them with its n-gram tokenizer
+    """
+
+    def create_index(self, index, clear_index=False):
+        load_database_mapping(index=index, clear_index=clear_index)
+
+    def add_documents(self, documents, index, batch_size=settings.ELASTICSEARCH_BULK_SIZE):
+        return add_documents_to_index(documents, index=index, batch_size=batch_size)
+
+    def get_existing_document_ids(self, ids, index):
+        return get_existing_document_ids(ids, index=index)
+
+    def get_document(self, id, index):
+        return get_document(id, index)
+
+    def get_matching_items(self, index, fingerprint, threshold):
+        return get_matching_items_for_fingerprint(index, fingerprint, threshold)
+
+    def get_matching_items_batch(self, index, fingerprints, threshold):
+        return get_matching_items_for_fingerprints(index, fingerprints, threshold)
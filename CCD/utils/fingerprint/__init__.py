@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Version of the fingerprint format, to be increased whenever a change alters generated fingerprints
+FINGERPRINT_VERSION = 1
+
+class Fingerprint(object):
+    """
+    Structured form of a fingerprint: a list of contracts, each being a list of function hashes.
+    Its text form joins the functions with '.' and the contracts with ':'.
+    """
+
+    def __init__(self, contracts):
+        # An empty fingerprint has the same structure as splitting an empty text
+        if not contracts:
+            contracts = [[""]]
+        self.contracts = contracts
+        self.text = ":".join([".".join(contract) for contract in contracts])
+        self.sizes = [sum([len(function) for function in contract]) for contract in contracts]
+        self._indexes = None
+
+    @staticmethod
+    def from_text(text):
+        return Fingerprint([contract.split(".") for contract in text.split(":")])
+
+    @staticmethod
+    def from_document(document):
+        # Documents stored before the structured form was introduced only provide the text form
+        if document.get("fingerprint_contracts"):
+            return Fingerprint(document["fingerprint_contracts"])
+        return Fingerprint.from_text(document["fingerprint"])
+
+    def get_indexes(self):
+        """
+        Returns for every contract the set of its function hashes, the sorted distinct lengths of
+        its function hashes and the function hashes grouped by length
+        """
+        if self._indexes is None:
+            self._indexes = list()
+            for contract in self.contracts:
+                functions_by_length = dict()
+                for function in contract:
+                    functions_by_length.setdefault(len(function), list()).append(function)
+                self._indexes.append((set(contract), sorted(functions_by_length), functions_by_length))
+        return self._indexes
+
+    def __len__(self):
+        return len(self.text)
+
+    def __str__(self):
+        return self.text
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import ssdeep
+
+from utils import settings
+from utils.utils import colors
+from utils.normalizer import SOLIDITY_LANGUAGE_KEYWORDS
+
+# Tokens that occur in almost every normalized contract
+SOLIDITY_TOKENS = SOLIDITY_LANGUAGE_KEYWORDS + [
+    "contract", "library", "interface", "abstract", "function", "fallback", "receive", "constructor", "modifier", "event", "emit", "returns", "return",
+    "if", "else", "for", "while", "do", "break", "continue", "throw", "new", "delete", "true", "false", "payable", "memory", "storage", "calldata",
+    "address", "bool", "string", "bytes", "byte", "uint", "int", "mapping", "var", "ether", "wei", "gwei", "finney", "szabo",
+    "sender", "value", "data", "sig", "gas", "gasleft", "balance", "transfer", "send", "call", "delegatecall", "staticcall", "length", "push", "pop",
+    "timestamp", "number", "coinbase", "difficulty", "gaslimit", "blockhash", "tx", "origin", "gasprice", "abi", "encode", "encodePacked",
+    "c", "l", "i", "a", "f", "v", "m", "e", "s", "0", "1", "2",
+    "&&", "||", ">=", "<=", "==", "!=", ">", "<", ".", "+", "-", "/", "*", ",", "!", "=", "%", "&", "|", "^", "~", "?", ":", "++", "--",
+] + ["uint"+str(bits) for bits in range(8, 257, 8)] + ["int"+str(bits) for bits in range(8, 257, 8)] + ["bytes"+str(size) for size in range(1, 33)]
+
+global HASHES
+HASHES = dict()
+
+global SEEDED_HASHES
+SEEDED_HASHES = dict()
+
+global HITS
+HITS = 0
+
+global MISSES
+MISSES = 0
+
+def hash_token(token):
+    """
+    Returns the ssdeep hash of a token without its block size, memoized in a table bounded by TOKEN_HASH_CACHE_SIZE
+    """
+    global HASHES
+    global HITS
+    global MISSES
+
+    hash = HASHES.get(token)
+    if hash is not None:
+        HITS += 1
+        return hash
+    MISSES += 1
+    hash = ssdeep.hash(token).split(":")[1]
+    # Once the table is full, it starts over from the seeded tokens
+    if len(HASHES) >= settings.TOKEN_HASH_CACHE_SIZE:
+        HASHES = dict(SEEDED_HASHES)
+    HASHES[token] = hash
+    return hash
+
+def seed_token_hashes():
+    # Called at import time, so that forked workers inherit the seeded table from their parent
+    global HASHES
+
+    for token in SOLIDITY_TOKENS:
+        if token not in SEEDED_HASHES:
+            SEEDED_HASHES[token] = ssdeep.hash(token).split(":")[1]
+    HASHES = dict(SEEDED_HASHES)
+
+def get_hash_statistics():
+    return HITS, MISSES
+
+def print_hash_statistics(hits, misses):
+    lookups = hits + misses
+    hit_rate = hits / lookups * 100 if lookups else 0.0
+    print("Token hash lookups:", colors.INFO+str(lookups)+colors.END, "("+colors.INFO+"{:.2f}".format(hit_rate)+"%"+colors.END, "hit rate)")
+
+seed_token_hashes()
@@ -1,415 +1,571 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from utils.parser import parser
+from collections import Counter
 
-global IDENTIFIERS
-IDENTIFIERS = dict()
+from utils import settings
+from utils.parser import parser
 
 global SOLIDITY_LANGUAGE_KEYWORDS
 SOLIDITY_LANGUAGE_KEYWORDS = ["selfdestruct", "assert", "require", "revert", "addmod", "mulmod", "keccak256", "sha3", "sha256", "ripemd160", "ecrecover", "this", "msg", "block", "_", "now"]
 
-def clear_parser_identifiers():
-    global IDENTIFIERS
-    IDENTIFIERS = dict()
+def compact_output(output, start):
+    # Joins the parts written since start, so that the buffer holds few parts per function
+    output[start:] = ["".join(output[start:])]
 
-def normalize_child(child):
-    global IDENTIFIERS
+class Normalizer(object):
+    """
+    Normalizes the AST of a source unit. Every instance owns its table of renamed identifiers,
+    so that several source units can be normalized concurrently by different instances.
 
-    if child == None:
-        return ""
+    Every handler appends the normalized text of a node to the output buffer, a list of strings.
+    Handlers that need the text of a child node, e.g. to rename identifiers, normalize it into a
+    buffer of its own. Handlers of nodes with children yield these children instead of calling
+    normalize_child.
+    """
 
-    if type(child) == str:
-        return child
+    def __init__(self, keywords=SOLIDITY_LANGUAGE_KEYWORDS):
+        self.identifiers = dict()
+        self.keywords = frozenset(keywords)
+        # Number of normalized nodes per node type, only counted in debug mode
+        self.node_type_counts = Counter()
 
-    if type(child) == list:
-        for element in child:
-            return normalize_child(element)
+    def normalize_pragma_directive(self, child, output):
+        pass
 
-    if child.type == "PragmaDirective":
-        return ""
+    def normalize_file_level_constant(self, child, output):
+        pass
 
-    if child.type == "FileLevelConstant":
-        return ""
-
-    if child.type == "ContractDefinition":
+    def normalize_contract_definition(self, child, output):
         base = ""
         for i in range(len(child.baseContracts)):
             base_contract = child.baseContracts[i]
             if i == 0:
                 base += " is "
-            base_name = normalize_child(base_contract)
-            if not base_name in IDENTIFIERS:
-                IDENTIFIERS[base_name] = child.kind[0]
-            base += IDENTIFIERS[base_name]
+            buffer = list()
+            yield base_contract, buffer
+            base_name = "".join(buffer)
+            if not base_name in self.identifiers:
+                self.identifiers[base_name] = child.kind[0]
+            base += self.identifiers[base_name]
             if i < len(child.baseContracts) - 1:
                 base += ","
-        if not child.name in IDENTIFIERS:
-            IDENTIFIERS[child.name] = child.kind[0]
-        contract_definition = child.kind + " " + IDENTIFIERS[child.name] + base + "{"
+        if not child.name in self.identifiers:
+            self.identifiers[child.name] = child.kind[0]
+        output.append(child.kind + " " + self.identifiers[child.name] + base + "{")
         for sub_node in child.subNodes:
-            contract_definition += normalize_child(sub_node)
-        return contract_definition + "}"
+            yield sub_node, output
+        output.append("}")
 
-    if child.type == "InheritanceSpecifier":
-        return normalize_child(child.baseName)
+    def normalize_inheritance_specifier(self, child, output):
+        yield child.baseName, output
 
-    if child.type == "UserDefinedTypeName":
-        return child.namePath
+    def normalize_user_defined_type_name(self, child, output):
+        output.append(child.namePath)
 
-    if child.type == "FunctionDefinition":
+    def normalize_function_definition(self, child, output):
+        start = len(output)
         if "function()" in child.name:
-            function_definition = "function fallback("
-        elif child.name == "constructor" or child.name in IDENTIFIERS and IDENTIFIERS[child.name] == 'c':
-            function_definition = "constructor("
+            output.append("function fallback(")
+        elif child.name == "constructor" or child.name in self.identifiers and self.identifiers[child.name] == 'c':
+            output.append("constructor(")
         else:
-            IDENTIFIERS[child.name] = "f"
-            function_definition = "function " + IDENTIFIERS[child.name] + "("
-        function_definition += normalize_child(child.parameters) + ")"
+            self.identifiers[child.name] = "f"
+            output.append("function " + self.identifiers[child.name] + "(")
+        yield child.parameters, output
+        output.append(")")
         for modifier in child.modifiers:
-            function_definition += " " + normalize_child(modifier)
+            output.append(" ")
+            yield modifier, output
         if child.returnParameters:
-            function_definition += "returns("
-            function_definition += normalize_child(child.returnParameters)
-            function_definition += ")"
-        function_definition += "{"
+            output.append("returns(")
+            yield child.returnParameters, output
+            output.append(")")
+        output.append("{")
         if child.body:
             for statement in child.body.statements:
                 if type(statement) == list:
                     for element in statement:
                         if type(element) == str:
-                            function_definition += element
+                            output.append(element)
                         else:
-                            function_definition += normalize_child(element)
+                            yield element, output
                 else:
-                    function_definition += normalize_child(statement)
-        function_definition += "}"
-        return function_definition
+                    yield statement, output
+        output.append("}")
+        compact_output(output, start)
 
-    if child.type == "FunctionCall":
+    def normalize_function_call(self, child, output):
         if type(child.expression) == list:
-            function_call = ""
             for e in child.expression:
                 if type(e) == list:
                     for e2 in e:
-                        if type(e2) == parser.Node:
-                            if "name" in e2 and e2.name not in IDENTIFIERS and e2.type == "Identifier" and e2.name not in SOLIDITY_LANGUAGE_KEYWORDS:
-                                IDENTIFIERS[e2.name] = "f"
-                            function_call += normalize_child(e2)
+                        if isinstance(e2, parser.NODE_CLASSES):
+                            if "name" in e2 and e2.name not in self.identifiers and e2.type == "Identifier" and e2.name not in self.keywords:
+                                self.identifiers[e2.name] = "f"
+                            yield e2, output
                         else:
-                            function_call += str(e2)
+                            output.append(str(e2))
                 else:
-                    if type(e) == parser.Node:
-                        if "name" in e and e.name not in IDENTIFIERS and e.type == "Identifier" and e.name not in SOLIDITY_LANGUAGE_KEYWORDS:
-                            IDENTIFIERS[e.name] = "f"
-                        function_call += normalize_child(e)
+                    if isinstance(e, parser.NODE_CLASSES):
+                        if "name" in e and e.name not in self.identifiers and e.type == "Identifier" and e.name not in self.keywords:
+                            self.identifiers[e.name] = "f"
+                        yield e, output
                     else:
-                        function_call += str(e)
-            function_call += "("
+                        output.append(str(e))
+            output.append("(")
         elif type(child.expression) == str:
-            function_call = child.expression + "("
+            output.append(child.expression + "(")
         else:
             if child.expression:
-                if "name" in child.expression and child.expression.name not in IDENTIFIERS and child.expression.type == "Identifier" and child.expression.name not in SOLIDITY_LANGUAGE_KEYWORDS:
-                    IDENTIFIERS[child.expression.name] = "f"
-                function_call = normalize_child(child.expression) + "("
+                if "name" in child.expression and child.expression.name not in self.identifiers and child.expression.type == "Identifier" and child.expression.name not in self.keywords:
+                    self.identifiers[child.expression.name] = "f"
+                yield child.expression, output
+                output.append("(")
             else:
-                function_call = "f("
+                output.append("f(")
         for i in range(len(child.arguments)):
             argument = child.arguments[i]
             if type(argument) == list:
                 for arg in argument:
-                    if type(arg) == parser.Node:
-                        function_call += normalize_child(arg)
+                    if isinstance(arg, parser.NODE_CLASSES):
+                        yield arg, output
                     else:
-                        function_call += str(arg)
+                        output.append(str(arg))
             else:
-                function_call += normalize_child(argument)
+                yield argument, output
             if i < len(child.arguments) - 1:
-                 function_call += ","
-        function_call += ")"
-        return function_call
-
-    if child.type == "ModifierDefinition":
-        if not child.name in IDENTIFIERS:
-            IDENTIFIERS[child.name] = "m"
-        modifier_definition = "modifier " + IDENTIFIERS[child.name] + "("
+                 output.append(",")
+        output.append(")")
+
+    def normalize_modifier_definition(self, child, output):
+        start = len(output)
+        if not child.name in self.identifiers:
+            self.identifiers[child.name] = "m"
+        output.append("modifier " + self.identifiers[child.name] + "(")
         if child.parameters:
-            modifier_definition += normalize_child(child.parameters)
-        modifier_definition += "){"
+            yield child.parameters, output
+        output.append("){")
         if child.body and "statements" in child.body:
             for statement in child.body.statements:
-                modifier_definition += normalize_child(statement)
-        modifier_definition += "}"
-        return modifier_definition
-
-    if child.type == "ModifierInvocation":
-        if not child.name in IDENTIFIERS:
-            IDENTIFIERS[child.name] = "m"
-        modifier_invocation = IDENTIFIERS[child.name] + "("
+                yield statement, output
+        output.append("}")
+        compact_output(output, start)
+
+    def normalize_modifier_invocation(self, child, output):
+        if not child.name in self.identifiers:
+            self.identifiers[child.name] = "m"
+        output.append(self.identifiers[child.name] + "(")
         for argument in child.arguments:
-            modifier_invocation += normalize_child(argument)
-        modifier_invocation += ")"
-        return modifier_invocation
+            yield argument, output
+        output.append(")")
 
-    if child.type == "VariableDeclarationStatement":
-        variable_declaration = ""
+    def normalize_variable_declaration_statement(self, child, output):
         if child.variables:
             for variable in child.variables:
                 if child.initialValue:
-                    variable_declaration += normalize_child(variable) + "=" + normalize_child(child.initialValue) + ";"
+                    yield variable, output
+                    output.append("=")
+                    yield child.initialValue, output
+                    output.append(";")
                 else:
-                    variable_declaration += normalize_child(variable) + ";"
+                    yield variable, output
+                    output.append(";")
         elif not child.variables and child.initialValue:
-            variable_declaration += normalize_child(child.initialValue) + ";"
-        return variable_declaration
+            yield child.initialValue, output
+            output.append(";")
 
-    if child.type == "StateVariableDeclaration":
+    def normalize_state_variable_declaration(self, child, output):
+        # Only registers the identifiers of the variables
         for variable in child.variables:
-            normalize_child(variable)
-        return ""
+            yield variable, list()
 
-    if child.type == "VariableDeclaration":
+    def normalize_variable_declaration(self, child, output):
         variable_name = child.name
-        if not variable_name in IDENTIFIERS.keys():
+        if not variable_name in self.identifiers.keys():
             if "typeName" in child:
-                IDENTIFIERS[variable_name] = normalize_child(child.typeName)
+                buffer = list()
+                yield child.typeName, buffer
+                self.identifiers[variable_name] = "".join(buffer)
             else:
-                IDENTIFIERS[variable_name] = "uint"
-        return IDENTIFIERS[variable_name]
-
-    if child.type == "IndexAccess":
-        variable_name = normalize_child(child.base)
-        if not variable_name in IDENTIFIERS.keys() and not variable_name in IDENTIFIERS.values():
-            IDENTIFIERS[variable_name] = "mapping"
-        if variable_name in IDENTIFIERS.keys():
-            return IDENTIFIERS[variable_name] + "[" + normalize_child(child.index) + "]"
-        return "mapping" + "[" + normalize_child(child.index) + "]"
-
-    if child.type == "MemberAccess":
-        expression = normalize_child(child.expression)
+                self.identifiers[variable_name] = "uint"
+        output.append(self.identifiers[variable_name])
+
+    def normalize_index_access(self, child, output):
+        buffer = list()
+        yield child.base, buffer
+        variable_name = "".join(buffer)
+        if not variable_name in self.identifiers.keys() and not variable_name in self.identifiers.values():
+            self.identifiers[variable_name] = "mapping"
+        if variable_name in self.identifiers.keys():
+            output.append(self.identifiers[variable_name] + "[")
+        else:
+            output.append("mapping" + "[")
+        yield child.index, output
+        output.append("]")
+
+    def normalize_member_access(self, child, output):
+        buffer = list()
+        yield child.expression, buffer
+        expression = "".join(buffer)
         if child.memberName == "call" and expression == "uint":
             expression = "address"
-        return expression + "." + child.memberName
-
-    if child.type in ["Identifier", "ElementaryTypeName"]:
-        if child.name in SOLIDITY_LANGUAGE_KEYWORDS:
-            return child.name
-        if child.name in IDENTIFIERS:
-            return IDENTIFIERS[child.name]
-        if child.type == "Identifier":
-            IDENTIFIERS[child.name] = "uint"
-            return IDENTIFIERS[child.name]
-        if child.type == "ElementaryTypeName":
-            if child.name == "uint256":
-                return "uint"
-        return child.name
-
-    if child.type == "ExpressionStatement":
+        output.append(expression + "." + child.memberName)
+
+    def normalize_identifier(self, child, output):
+        if child.name in self.keywords:
+            output.append(child.name)
+        elif child.name in self.identifiers:
+            output.append(self.identifiers[child.name])
+        elif child.type == "Identifier":
+            self.identifiers[child.name] = "uint"
+            output.append(self.identifiers[child.name])
+        elif child.type == "ElementaryTypeName" and child.name == "uint256":
+            output.append("uint")
+        else:
+            output.append(child.name)
+
+    def normalize_expression_statement(self, child, output):
         if type(child.expression) == list:
-            expression_statement = ""
             for expression in child.expression:
-                if type(expression) == parser.Node:
-                    expression_statement += normalize_child(expression)
+                if isinstance(expression, parser.NODE_CLASSES):
+                    yield expression, output
                 else:
-                    expression_statement += str(expression)
-            return expression_statement + ";"
+                    output.append(str(expression))
         else:
-            return normalize_child(child.expression) + ";"
-
-    if child.type == "IfStatement":
+            yield child.expression, output
+        output.append(";")
+
+    def normalize_if_statement(self, child, output):
+        # The bodies are normalized before the condition, as they may introduce identifiers. The
+        # condition is written afterwards into a slot reserved in front of the bodies.
+        output.append("if(")
+        condition = len(output)
+        output.append("")
         true_body = child.TrueBody
-        if type(true_body) == parser.Node:
-            true_body = normalize_child(true_body)
+        if isinstance(true_body, parser.NODE_CLASSES):
+            output.append("){")
+            yield true_body, output
+            output.append("}")
+        elif true_body:
+            output.append("){" + true_body + "}")
+        else:
+            output.append("){}")
         if child.FalseBody:
             false_body = child.FalseBody
-            if type(false_body) == parser.Node:
-                false_body = normalize_child(false_body)
-            if true_body:
-                return "if(" + normalize_child(child.condition) + "){" + true_body + "}else{" + false_body + "}"
+            if isinstance(false_body, parser.NODE_CLASSES):
+                output.append("else{")
+                yield false_body, output
+                output.append("}")
             else:
-                return "if(" + normalize_child(child.condition) + "){}else{" + false_body + "}"
-        else:
-            if true_body:
-                return "if(" + normalize_child(child.condition) + "){" + true_body + "}"
-            else:
-                return "if(" + normalize_child(child.condition) + "){}"
+                output.append("else{" + false_body + "}")
+        buffer = list()
+        yield child.condition, buffer
+        output[condition] = "".join(buffer)
 
-    if child.type == "Block":
-        block = ""
+    def normalize_block(self, child, output):
         for statement in child.statements:
             if type(statement) == list:
                 for element in statement:
                     if type(element) == str:
-                        block += element
+                        output.append(element)
                     else:
-                        block += normalize_child(element)
+                        yield element, output
             elif type(statement) == str:
-                block += statement
+                output.append(statement)
             else:
-                block += normalize_child(statement)
-        return block
+                yield statement, output
 
-    if child.type == "BinaryOperation":
-        left = ""
+    def normalize_binary_operation(self, child, output):
         if type(child.left) == list:
             for i in range(len(child.left)):
                 c = child.left[i]
-                if type(c) == parser.Node:
-                    left += normalize_child(c)
+                if isinstance(c, parser.NODE_CLASSES):
+                    yield c, output
                 else:
-                    left += str(c)
+                    output.append(str(c))
         else:
-            left = normalize_child(child.left)
-        right = ""
+            yield child.left, output
+        output.append(child.operator)
         if type(child.right) == list:
             for i in range(len(child.right)):
                 c = child.right[i]
-                if type(c) == parser.Node:
-                    right += normalize_child(c)
+                if isinstance(c, parser.NODE_CLASSES):
+                    yield c, output
                 else:
-                    right += str(c)
+                    output.append(str(c))
         else:
-            right = normalize_child(child.right)
-        return left + child.operator + right
+            yield child.right, output
 
-    if child.type == "NumberLiteral":
+    def normalize_number_literal(self, child, output):
         if child.subdenomination:
-            return child.number + child.subdenomination
-        return child.number
+            output.append(child.number + child.subdenomination)
+        else:
+            output.append(child.number)
 
-    if child.type == "stringLiteral":
-        return "stringLiteral"
+    def normalize_string_literal(self, child, output):
+        output.append("stringLiteral")
 
-    if child.type == "EmitStatement":
-        return "emit " + normalize_child(child.eventCall) + ";"
+    def normalize_emit_statement(self, child, output):
+        output.append("emit ")
+        yield child.eventCall, output
+        output.append(";")
 
-    if child.type == "TupleExpression":
-        tuple_expression = "("
+    def normalize_tuple_expression(self, child, output):
+        output.append("(")
         for component in child.components:
-            tuple_expression += normalize_child(component)
-        tuple_expression += ")"
-        return tuple_expression
+            yield component, output
+        output.append(")")
 
-    if child.type == "ArrayTypeName":
-        array_name = normalize_child(child.baseTypeName) + "["
+    def normalize_array_type_name(self, child, output):
+        yield child.baseTypeName, output
+        output.append("[")
         if child.length:
-            if type(child.length) == parser.Node:
-                array_name += normalize_child(child.length)
+            if isinstance(child.length, parser.NODE_CLASSES):
+                yield child.length, output
             else:
-                array_name += child.length
-        array_name += "]"
-        return array_name
+                output.append(child.length)
+        output.append("]")
 
-    if child.type == "UnaryOperation":
+    def normalize_unary_operation(self, child, output):
         if child.isPrefix:
-            return child.operator + normalize_child(child.subExpression)
+            output.append(child.operator)
+            yield child.subExpression, output
         else:
-            return normalize_child(child.subExpression) + child.operator
+            yield child.subExpression, output
+            output.append(child.operator)
 
-    if child.type == "BooleanLiteral":
-        return str(child.value).lower()
+    def normalize_boolean_literal(self, child, output):
+        output.append(str(child.value).lower())
 
-    if child.type == "EnumDefinition":
-        enum_definition = "enum " + child.name + "{"
+    def normalize_enum_definition(self, child, output):
+        output.append("enum " + child.name + "{")
         for i in range(len(child.members)):
             member = child.members[i]
-            enum_definition += normalize_child(member)
+            yield member, output
             if i < len(child.members) - 1:
-                enum_definition += ","
-        enum_definition += "}"
-        return enum_definition
+                output.append(",")
+        output.append("}")
 
-    if child.type == "EnumValue":
-        return child.name
+    def normalize_enum_value(self, child, output):
+        output.append(child.name)
 
-    if child.type == "EventDefinition":
-        IDENTIFIERS[child.name] = "e"
-        return "event e(" + normalize_child(child.parameters) + ");"
+    def normalize_event_definition(self, child, output):
+        self.identifiers[child.name] = "e"
+        output.append("event e(")
+        yield child.parameters, output
+        output.append(");")
 
-    if child.type == "ParameterList":
-        parameters = ""
+    def normalize_parameter_list(self, child, output):
         for i in range(len(child.parameters)):
             parameter = child.parameters[i]
             parameter_name = parameter.name
-            if not parameter_name in IDENTIFIERS.keys():
-                IDENTIFIERS[parameter_name] = normalize_child(parameter.typeName)
-            parameters += IDENTIFIERS[parameter_name]
+            if not parameter_name in self.identifiers.keys():
+                buffer = list()
+                yield parameter.typeName, buffer
+                self.identifiers[parameter_name] = "".join(buffer)
+            output.append(self.identifiers[parameter_name])
             if i < len(child.parameters) - 1:
-                parameters += ","
-        return parameters
+                output.append(",")
 
-    if child.type == "StructDefinition":
-        struct_definition = "struct "
+    def normalize_struct_definition(self, child, output):
         struct_name = child.name
-        if not struct_name in IDENTIFIERS.keys():
-            IDENTIFIERS[struct_name] = "s"
-        struct_definition += IDENTIFIERS[struct_name] + "{"
+        if not struct_name in self.identifiers.keys():
+            self.identifiers[struct_name] = "s"
+        output.append("struct " + self.identifiers[struct_name] + "{")
         for member in child.members:
-            struct_definition += normalize_child(member) + ";"
-        struct_definition += "}"
-        return struct_definition
-
-    if child.type == "Mapping":
-        return "mapping(" + normalize_child(child.keyType) + "=>" + normalize_child(child.valueType) + ")"
-
-    if child.type == "NewExpression":
-        return "new " + normalize_child(child.typeName)
-
-    if child.type == "ForStatement":
-        return "for(" + normalize_child(child.initExpression) + normalize_child(child.conditionExpression) + ";" + normalize_child(child.loopExpression) + "){" + normalize_child(child.body) + "}"
-
-    if child.type == "CustomErrorDefinition":
-        return "error " + normalize_child(child.name) + "(" + normalize_child(child.parameterList) + ");"
-
-    if child.type == "RevertStatement":
-        return "revert " + normalize_child(child.functionCall) + ";"
-
-    if child.type == "UsingForDeclaration":
-        if type(child.typeName) == parser.Node:
-            return "using " + child.libraryName + " for " + normalize_child(child.typeName) + ";"
+            yield member, output
+            output.append(";")
+        output.append("}")
+
+    def normalize_mapping(self, child, output):
+        output.append("mapping(")
+        yield child.keyType, output
+        output.append("=>")
+        yield child.valueType, output
+        output.append(")")
+
+    def normalize_new_expression(self, child, output):
+        output.append("new ")
+        yield child.typeName, output
+
+    def normalize_for_statement(self, child, output):
+        output.append("for(")
+        yield child.initExpression, output
+        yield child.conditionExpression, output
+        output.append(";")
+        yield child.loopExpression, output
+        output.append("){")
+        yield child.body, output
+        output.append("}")
+
+    def normalize_custom_error_definition(self, child, output):
+        output.append("error ")
+        yield child.name, output
+        output.append("(")
+        yield child.parameterList, output
+        output.append(");")
+
+    def normalize_revert_statement(self, child, output):
+        output.append("revert ")
+        yield child.functionCall, output
+        output.append(";")
+
+    def normalize_using_for_declaration(self, child, output):
+        if isinstance(child.typeName, parser.NODE_CLASSES):
+            output.append("using " + child.libraryName + " for ")
+            yield child.typeName, output
+            output.append(";")
         else:
-            return "using " + str(child.libraryName) + " for " + str(child.typeName) + ";"
-
-    if child.type == "Conditional":
-        return normalize_child(child.condition) + "?" + normalize_child(child.TrueExpression) + ":" + normalize_child(child.FalseExpression) + ";"
-
-    if child.type == "WhileStatement":
-        return "while(" + normalize_child(child.condition) + "){" + normalize_child(child.body) + "}"
-
-    if child.type == "ImportDirective":
-        return ""
-
-    if child.type == "ThrowStatement":
-        return "throw;"
-
-    if child.type == "hexLiteral":
-        return child.value
-
-    if child.type == "TryStatement":
-        try_statement = "try " + normalize_child(child.expression) + "returns(" + normalize_child(child.returnParameters) + "){" + normalize_child(child.block) + "}"
+            output.append("using " + str(child.libraryName) + " for " + str(child.typeName) + ";")
+
+    def normalize_conditional(self, child, output):
+        yield child.condition, output
+        output.append("?")
+        yield child.TrueExpression, output
+        output.append(":")
+        yield child.FalseExpression, output
+        output.append(";")
+
+    def normalize_while_statement(self, child, output):
+        output.append("while(")
+        yield child.condition, output
+        output.append("){")
+        yield child.body, output
+        output.append("}")
+
+    def normalize_import_directive(self, child, output):
+        pass
+
+    def normalize_throw_statement(self, child, output):
+        output.append("throw;")
+
+    def normalize_hex_literal(self, child, output):
+        output.append(child.value)
+
+    def normalize_try_statement(self, child, output):
+        output.append("try ")
+        yield child.expression, output
+        output.append("returns(")
+        yield child.returnParameters, output
+        output.append("){")
+        yield child.block, output
+        output.append("}")
         for clause in child.catchClause:
-            try_statement += normalize_child(clause)
-        return try_statement
-
-    if child.type == "CatchClause":
-        catch_clause = "catch " + normalize_child(child.identifier) + "(" + normalize_child(child.parameterList) + "){" + normalize_child(child.block) + "}"
-        return catch_clause
-
-    if child.type == "UncheckedStatement":
-        return "unchecked{" + normalize_child(child.body) + "}"
-
-    if child.type == "FunctionTypeName":
-        return ""
-
-    if child.type == "InLineAssemblyStatement":
-        return ""
-
-    if child.type == "DoWhileStatement":
-        return "do{" + normalize_child(child.body) + "}while(" + normalize_child(child.condition) + ");"
-
-    else:
-        print("Unknown type", child.type)
-        import pprint
-        pprint.pprint(child)
-        raise Exception("Unknown type: "+str(child.type))
+            yield clause, output
+
+    def normalize_catch_clause(self, child, output):
+        output.append("catch ")
+        yield child.identifier, output
+        output.append("(")
+        yield child.parameterList, output
+        output.append("){")
+        yield child.block, output
+        output.append("}")
+
+    def normalize_unchecked_statement(self, child, output):
+        output.append("unchecked{")
+        yield child.body, output
+        output.append("}")
+
+    def normalize_function_type_name(self, child, output):
+        pass
+
+    def normalize_in_line_assembly_statement(self, child, output):
+        pass
+
+    def normalize_do_while_statement(self, child, output):
+        output.append("do{")
+        yield child.body, output
+        output.append("}while(")
+        yield child.condition, output
+        output.append(");")
+
+    NORMALIZERS = {
+        "PragmaDirective": normalize_pragma_directive,
+        "FileLevelConstant": normalize_file_level_constant,
+        "ContractDefinition": normalize_contract_definition,
+        "InheritanceSpecifier": normalize_inheritance_specifier,
+        "UserDefinedTypeName": normalize_user_defined_type_name,
+        "FunctionDefinition": normalize_function_definition,
+        "FunctionCall": normalize_function_call,
+        "ModifierDefinition": normalize_modifier_definition,
+        "ModifierInvocation": normalize_modifier_invocation,
+        "VariableDeclarationStatement": normalize_variable_declaration_statement,
+        "StateVariableDeclaration": normalize_state_variable_declaration,
+        "VariableDeclaration": normalize_variable_declaration,
+        "IndexAccess": normalize_index_access,
+        "MemberAccess": normalize_member_access,
+        "Identifier": normalize_identifier,
+        "ElementaryTypeName": normalize_identifier,
+        "ExpressionStatement": normalize_expression_statement,
+        "IfStatement": normalize_if_statement,
+        "Block": normalize_block,
+        "BinaryOperation": normalize_binary_operation,
+        "NumberLiteral": normalize_number_literal,
+        "stringLiteral": normalize_string_literal,
+        "EmitStatement": normalize_emit_statement,
+        "TupleExpression": normalize_tuple_expression,
+        "ArrayTypeName": normalize_array_type_name,
+        "UnaryOperation": normalize_unary_operation,
+        "BooleanLiteral": normalize_boolean_literal,
+        "EnumDefinition": normalize_enum_definition,
+        "EnumValue": normalize_enum_value,
+        "EventDefinition": normalize_event_definition,
+        "ParameterList": normalize_parameter_list,
+        "StructDefinition": normalize_struct_definition,
+        "Mapping": normalize_mapping,
+        "NewExpression": normalize_new_expression,
+        "ForStatement": normalize_for_statement,
+        "CustomErrorDefinition": normalize_custom_error_definition,
+        "RevertStatement": normalize_revert_statement,
+        "UsingForDeclaration": normalize_using_for_declaration,
+        "Conditional": normalize_conditional,
+        "WhileStatement": normalize_while_statement,
+        "ImportDirective": normalize_import_directive,
+        "ThrowStatement": normalize_throw_statement,
+        "hexLiteral": normalize_hex_literal,
+        "TryStatement": normalize_try_statement,
+        "CatchClause": normalize_catch_clause,
+        "UncheckedStatement": normalize_unchecked_statement,
+        "FunctionTypeName": normalize_function_type_name,
+        "InLineAssemblyStatement": normalize_in_line_assembly_statement,
+        "DoWhileStatement": normalize_do_while_statement,
+    }
+
+    def normalize_child(self, child, output):
+        # Handlers of nodes with children are generators that yield each child together with the
+        # buffer receiving its normalized text. They are resumed from an explicit stack once the
+        # child is normalized, so that deeply nested code does not exhaust the call stack.
+        stack = list()
+        normalizers = self.NORMALIZERS
+        debug = settings.DEBUG_MODE
+        while True:
+            while type(child) == list and child:
+                child = child[0]
+
+            if child == None:
+                pass
+            elif type(child) == str:
+                output.append(child)
+            else:
+                normalizer = normalizers.get(child.type)
+                if normalizer is None:
+                    print("Unknown type", child.type)
+                    import pprint
+                    pprint.pprint(child)
+                    raise Exception("Unknown type: "+str(child.type))
+                if debug:
+                    self.node_type_counts[child.type] += 1
+                handler = normalizer(self, child, output)
+                if handler is not None:
+                    stack.append(handler)
+
+            while stack:
+                try:
+                    child, output = next(stack[-1])
+                    break
+                except StopIteration:
+                    stack.pop()
+            else:
+                return
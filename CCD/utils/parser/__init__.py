@@ -1,3 +1,3 @@
-from .parser import parse_file, parse, objectify, visit
+from .parser import parse_file, parse, get_parse_statistics, reset_parse_statistics, objectify, visit
 
-__ALL__ = ["parse", "parse_file", "objectify", "visit"]
+__ALL__ = ["parse", "parse_file", "get_parse_statistics", "reset_parse_statistics", "objectify", "visit"]
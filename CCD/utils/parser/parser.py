@@ -10,6 +10,16 @@ from antlr4 import *
 from utils.parser.solidity_antlr4.SolidityLexer import SolidityLexer
 from utils.parser.solidity_antlr4.SolidityParser import SolidityParser
 from utils.parser.solidity_antlr4.SolidityVisitor import SolidityVisitor
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+
+# number of parses that succeeded with SLL prediction and that fell back to full LL prediction
+global SLL_PARSES
+SLL_PARSES = 0
+
+global LL_FALLBACKS
+LL_FALLBACKS = 0
 
 
 class Node(dict):
@@ -46,8 +56,76 @@ class Node(dict):
         }
 
 
+class CompactNode(object):
+    """
+    slotted alternative to Node: the node type is stored on a per-type class and
+    the attributes in slots, so that nodes do not carry their own hash table
+    """
+    __slots__ = ()
+    NONCHILD_KEYS = Node.NONCHILD_KEYS
+    CLASSES = {}
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __getattr__(self, item):
+        raise KeyError(item)  # same exception as Node for missing attributes
+
+    def __getitem__(self, item):
+        return getattr(self, item)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key == "type" or key in self.__slots__
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.__slots__) + 1
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self else default
+
+    def keys(self):
+        return ("type",) + self.__slots__
+
+    def values(self):
+        return [getattr(self, key) for key in self.keys()]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    @staticmethod
+    def create(ctx, **kwargs):
+        node_type = kwargs.pop("type")
+        if Node.ENABLE_LOC:
+            kwargs["loc"] = Node._get_loc(ctx)
+        fields = tuple(kwargs)
+        cls = CompactNode.CLASSES.get((node_type, fields))
+        if cls is None:
+            # one class per node type and set of attributes, created on first use
+            cls = type(node_type, (CompactNode,), {"__slots__": fields, "type": node_type})
+            CompactNode.CLASSES[(node_type, fields)] = cls
+        return cls(*kwargs.values())
+
+
+# classes of the nodes produced by AstVisitor
+NODE_CLASSES = (Node, CompactNode)
+
+
 class AstVisitor(SolidityVisitor):
 
+    def __init__(self, compact=False):
+        super().__init__()
+        self.compact = compact
+
     def _mapCommasToNulls(self, children):
         if not children or len(children) == 0:
             return []
@@ -74,7 +152,8 @@ class AstVisitor(SolidityVisitor):
         return values
 
     def _createNode(self, **kwargs):
-        ## todo: add loc!
+        if self.compact:
+            return CompactNode.create(**kwargs)
         return Node(**kwargs)
 
     def visit(self, tree):
@@ -109,40 +188,40 @@ class AstVisitor(SolidityVisitor):
     # ********************************************************
 
     def visitSourceUnit(self, ctx):
-        return Node(ctx=ctx,
-                    type="SourceUnit",
-                    children=self.visit(ctx.children[:-1]))  # skip EOF
+        return self._createNode(ctx=ctx,
+                                type="SourceUnit",
+                                children=self.visit(ctx.children[:-1]))  # skip EOF
 
     def visitEnumDefinition(self, ctx):
-        return Node(ctx=ctx,
-                    type="EnumDefinition",
-                    name=ctx.identifier().getText(),
-                    members=self.visit(ctx.enumValue()))
+        return self._createNode(ctx=ctx,
+                                type="EnumDefinition",
+                                name=ctx.identifier().getText(),
+                                members=self.visit(ctx.enumValue()))
 
     def visitEnumValue(self, ctx):
-        return Node(ctx=ctx,
-                    type="EnumValue",
-                    name=ctx.identifier().getText())
+        return self._createNode(ctx=ctx,
+                                type="EnumValue",
+                                name=ctx.identifier().getText())
 
     def visitTypeDefinition(self, ctx):
-        return Node(ctx=ctx,
-                    type="TypeDefinition",
-                    typeKeyword=ctx.TypeKeyword().getText(),
-                    elementaryTypeName=self.visit(ctx.elementaryTypeName()))
+        return self._createNode(ctx=ctx,
+                                type="TypeDefinition",
+                                typeKeyword=ctx.TypeKeyword().getText(),
+                                elementaryTypeName=self.visit(ctx.elementaryTypeName()))
 
 
     def visitCustomErrorDefinition(self, ctx):
-        return Node(ctx=ctx,
-                    type="CustomErrorDefinition",
-                    name=self.visit(ctx.identifier()),
-                    parameterList=self.visit(ctx.parameterList()))
+        return self._createNode(ctx=ctx,
+                                type="CustomErrorDefinition",
+                                name=self.visit(ctx.identifier()),
+                                parameterList=self.visit(ctx.parameterList()))
 
     def visitFileLevelConstant(self, ctx):
-        return Node(ctx=ctx,
-                    type="FileLevelConstant",
-                    name=self.visit(ctx.identifier()),
-                    typeName=self.visit(ctx.typeName()),
-                    ConstantKeyword=self.visit(ctx.ConstantKeyword()))
+        return self._createNode(ctx=ctx,
+                                type="FileLevelConstant",
+                                name=self.visit(ctx.identifier()),
+                                typeName=self.visit(ctx.typeName()),
+                                ConstantKeyword=self.visit(ctx.ConstantKeyword()))
 
 
     def visitUsingForDeclaration(self, ctx: SolidityParser.UsingForDeclarationContext):
@@ -150,16 +229,16 @@ class AstVisitor(SolidityVisitor):
         if ctx.getChild(3) != '*':
             typename = self.visit(ctx.getChild(3))
 
-        return Node(ctx=ctx,
-                    type="UsingForDeclaration",
-                    typeName=typename,
-                    libraryName=ctx.identifier().getText())
+        return self._createNode(ctx=ctx,
+                                type="UsingForDeclaration",
+                                typeName=typename,
+                                libraryName=ctx.identifier().getText())
 
     def visitInheritanceSpecifier(self, ctx: SolidityParser.InheritanceSpecifierContext):
-        return Node(ctx=ctx,
-                    type="InheritanceSpecifier",
-                    baseName=self.visit(ctx.userDefinedTypeName()),
-                    arguments=self.visit(ctx.expressionList()))
+        return self._createNode(ctx=ctx,
+                                type="InheritanceSpecifier",
+                                baseName=self.visit(ctx.userDefinedTypeName()),
+                                arguments=self.visit(ctx.expressionList()))
 
     def visitContractPart(self, ctx: SolidityParser.ContractPartContext):
         if ctx.children:
@@ -205,41 +284,41 @@ class AstVisitor(SolidityVisitor):
         else:
             stateMutability = None
 
-        return Node(ctx=ctx,
-                    type="FunctionDefinition",
-                    name=name,
-                    parameters=parameters,
-                    returnParameters=returnParameters,
-                    body=block,
-                    visibility=visibility,
-                    modifiers=modifiers,
-                    isConstructor=isConstructor,
-                    isFallback=isFallback,
-                    isReceive=isReceive,
-                    stateMutability=stateMutability)
+        return self._createNode(ctx=ctx,
+                                type="FunctionDefinition",
+                                name=name,
+                                parameters=parameters,
+                                returnParameters=returnParameters,
+                                body=block,
+                                visibility=visibility,
+                                modifiers=modifiers,
+                                isConstructor=isConstructor,
+                                isFallback=isFallback,
+                                isReceive=isReceive,
+                                stateMutability=stateMutability)
 
     def visitReturnParameters(self, ctx: SolidityParser.ReturnParametersContext):
         return self.visit(ctx.parameterList())
 
     def visitParameterList(self, ctx: SolidityParser.ParameterListContext):
         parameters = [self.visit(p) for p in ctx.parameter()]
-        return Node(ctx=ctx,
-                    type="ParameterList",
-                    parameters=parameters)
+        return self._createNode(ctx=ctx,
+                                type="ParameterList",
+                                parameters=parameters)
 
     def visitParameter(self, ctx: SolidityParser.ParameterContext):
 
         storageLocation = ctx.storageLocation().getText() if ctx.storageLocation() else None
         name = ctx.identifier().getText() if ctx.identifier() else None
 
-        return Node(ctx=ctx,
-                    type="Parameter",
-                    typeName=self.visit(ctx.typeName()),
-                    name=name,
-                    storageLocation=storageLocation,
-                    isStateVar=False,
-                    isIndexed=False
-                    )
+        return self._createNode(ctx=ctx,
+                                type="Parameter",
+                                typeName=self.visit(ctx.typeName()),
+                                name=name,
+                                storageLocation=storageLocation,
+                                isStateVar=False,
+                                isIndexed=False
+                                )
 
     def visitModifierInvocation(self, ctx):
         exprList = ctx.expressionList()
@@ -249,15 +328,15 @@ class AstVisitor(SolidityVisitor):
         else:
             args = []
 
-        return Node(ctx=ctx,
-                    type='ModifierInvocation',
-                    name=ctx.identifier().getText(),
-                    arguments=args)
+        return self._createNode(ctx=ctx,
+                                type='ModifierInvocation',
+                                name=ctx.identifier().getText(),
+                                arguments=args)
 
     def visitElementaryTypeNameExpression(self, ctx):
-        return Node(ctx=ctx,
-                    type='ElementaryTypeNameExpression',
-                    typeName=self.visit(ctx.elementaryTypeName()))
+        return self._createNode(ctx=ctx,
+                                type='ElementaryTypeNameExpression',
+                                typeName=self.visit(ctx.elementaryTypeName()))
 
     def visitTypeName(self, ctx):
         if len(ctx.children) > 2:
@@ -265,16 +344,16 @@ class AstVisitor(SolidityVisitor):
             if len(ctx.children) == 4:
                 length = self.visit(ctx.getChild(2))
 
-            return Node(ctx=ctx,
-                        type='ArrayTypeName',
-                        baseTypeName=self.visit(ctx.getChild(0)),
-                        length=length)
+            return self._createNode(ctx=ctx,
+                                    type='ArrayTypeName',
+                                    baseTypeName=self.visit(ctx.getChild(0)),
+                                    length=length)
 
         if len(ctx.children) == 2:
-            return Node(ctx=ctx,
-                        type='ElementaryTypeName',
-                        name=ctx.getChild(0).getText(),
-                        stateMutability=ctx.getChild(1).getText())
+            return self._createNode(ctx=ctx,
+                                    type='ElementaryTypeName',
+                                    name=ctx.getChild(0).getText(),
+                                    stateMutability=ctx.getChild(1).getText())
 
         return self.visit(ctx.getChild(0))
 
@@ -295,12 +374,12 @@ class AstVisitor(SolidityVisitor):
         if ctx.stateMutability(0):
             stateMutability = ctx.stateMutability(0).getText()
 
-        return Node(ctx=ctx,
-                    type='FunctionTypeName',
-                    parameterTypes=parameterTypes,
-                    returnTypes=returnTypes,
-                    visibility=visibility,
-                    stateMutability=stateMutability)
+        return self._createNode(ctx=ctx,
+                                type='FunctionTypeName',
+                                parameterTypes=parameterTypes,
+                                returnTypes=returnTypes,
+                                visibility=visibility,
+                                stateMutability=stateMutability)
 
     def visitFunctionCall(self, ctx):
         args = []
@@ -317,26 +396,26 @@ class AstVisitor(SolidityVisitor):
                     args.append(self.visit(nameValue.expression()))
                     names.append(nameValue.identifier().getText())
 
-            return Node(ctx=ctx,
-                        type='FunctionCall',
-                        expression=self.visit(ctx.expression()),
-                        arguments=args,
-                        names=names)
+            return self._createNode(ctx=ctx,
+                                    type='FunctionCall',
+                                    expression=self.visit(ctx.expression()),
+                                    arguments=args,
+                                    names=names)
 
     def visitEmitStatement(self, ctx):
-        return Node(ctx=ctx,
-                    type='EmitStatement',
-                    eventCall=self.visit(ctx.getChild(1)))
+        return self._createNode(ctx=ctx,
+                                type='EmitStatement',
+                                eventCall=self.visit(ctx.getChild(1)))
 
     def visitThrowStatement(self, ctx):
-        return Node(ctx=ctx,
-                    type='ThrowStatement')
+        return self._createNode(ctx=ctx,
+                                type='ThrowStatement')
 
     def visitStructDefinition(self, ctx):
-        return Node(ctx=ctx,
-                    type='StructDefinition',
-                    name=ctx.identifier().getText(),
-                    members=self.visit(ctx.variableDeclaration()))
+        return self._createNode(ctx=ctx,
+                                type='StructDefinition',
+                                name=ctx.identifier().getText(),
+                                members=self.visit(ctx.variableDeclaration()))
 
     def visitVariableDeclaration(self, ctx):
         storageLocation = None
@@ -348,11 +427,11 @@ class AstVisitor(SolidityVisitor):
         if ctx.identifier():
             name = ctx.identifier().getText()
 
-        return Node(ctx=ctx,
-                    type='VariableDeclaration',
-                    typeName=self.visit(ctx.typeName()),
-                    name=name,
-                    storageLocation=storageLocation)
+        return self._createNode(ctx=ctx,
+                                type='VariableDeclaration',
+                                typeName=self.visit(ctx.typeName()),
+                                name=name,
+                                storageLocation=storageLocation)
 
     def visitEventParameter(self, ctx):
         storageLocation = None
@@ -362,13 +441,13 @@ class AstVisitor(SolidityVisitor):
         # if (ctx.storageLocation(0)):
         #    storageLocation = ctx.storageLocation(0).getText()
 
-        return Node(ctx=ctx,
-                    type='VariableDeclaration',
-                    typeName=self.visit(ctx.typeName()),
-                    name=ctx.identifier().getText(),
-                    storageLocation=storageLocation,
-                    isStateVar=False,
-                    isIndexed=not not ctx.IndexedKeyword())
+        return self._createNode(ctx=ctx,
+                                type='VariableDeclaration',
+                                typeName=self.visit(ctx.typeName()),
+                                name=ctx.identifier().getText(),
+                                storageLocation=storageLocation,
+                                isStateVar=False,
+                                isIndexed=not not ctx.IndexedKeyword())
 
     def visitFunctionTypeParameter(self, ctx):
         storageLocation = None
@@ -376,25 +455,25 @@ class AstVisitor(SolidityVisitor):
         if ctx.storageLocation():
             storageLocation = ctx.storageLocation().getText()
 
-        return Node(ctx=ctx,
-                    type='VariableDeclaration',
-                    typeName=self.visit(ctx.typeName()),
-                    name=None,
-                    storageLocation=storageLocation,
-                    isStateVar=False,
-                    isIndexed=False)
+        return self._createNode(ctx=ctx,
+                                type='VariableDeclaration',
+                                typeName=self.visit(ctx.typeName()),
+                                name=None,
+                                storageLocation=storageLocation,
+                                isStateVar=False,
+                                isIndexed=False)
 
     def visitWhileStatement(self, ctx):
-        return Node(ctx=ctx,
-                    type='WhileStatement',
-                    condition=self.visit(ctx.expression()),
-                    body=self.visit(ctx.statement()))
+        return self._createNode(ctx=ctx,
+                                type='WhileStatement',
+                                condition=self.visit(ctx.expression()),
+                                body=self.visit(ctx.statement()))
 
     def visitDoWhileStatement(self, ctx):
-        return Node(ctx=ctx,
-                    type='DoWhileStatement',
-                    condition=self.visit(ctx.expression()),
-                    body=self.visit(ctx.statement()))
+        return self._createNode(ctx=ctx,
+                                type='DoWhileStatement',
+                                condition=self.visit(ctx.expression()),
+                                body=self.visit(ctx.statement()))
 
     def visitIfStatement(self, ctx):
 
@@ -404,46 +483,46 @@ class AstVisitor(SolidityVisitor):
         if len(ctx.statement()) > 1:
             FalseBody = self.visit(ctx.statement(1))
 
-        return Node(ctx=ctx,
-                    type='IfStatement',
-                    condition=self.visit(ctx.expression()),
-                    TrueBody=TrueBody,
-                    FalseBody=FalseBody)
+        return self._createNode(ctx=ctx,
+                                type='IfStatement',
+                                condition=self.visit(ctx.expression()),
+                                TrueBody=TrueBody,
+                                FalseBody=FalseBody)
 
     def visitTryStatement(self, ctx):
-        return Node(ctx=ctx,
-                    type='TryStatement',
-                    expression=self.visit(ctx.expression()),
-                    block=self.visit(ctx.block()),
-                    returnParameters=self.visit(ctx.returnParameters()),
-                    catchClause=self.visit(ctx.catchClause()))
+        return self._createNode(ctx=ctx,
+                                type='TryStatement',
+                                expression=self.visit(ctx.expression()),
+                                block=self.visit(ctx.block()),
+                                returnParameters=self.visit(ctx.returnParameters()),
+                                catchClause=self.visit(ctx.catchClause()))
 
     def visitCatchClause(self, ctx):
-        return Node(ctx=ctx,
-                    type='CatchClause',
-                    identifier=self.visit(ctx.identifier()),
-                    parameterList=self.visit(ctx.parameterList()),
-                    block=self.visit(ctx.block()))
+        return self._createNode(ctx=ctx,
+                                type='CatchClause',
+                                identifier=self.visit(ctx.identifier()),
+                                parameterList=self.visit(ctx.parameterList()),
+                                block=self.visit(ctx.block()))
 
     def visitUserDefinedTypeName(self, ctx):
-        return Node(ctx=ctx,
-                    type='UserDefinedTypeName',
-                    namePath=ctx.getText())
+        return self._createNode(ctx=ctx,
+                                type='UserDefinedTypeName',
+                                namePath=ctx.getText())
 
     def visitElementaryTypeName(self, ctx):
-        return Node(ctx=ctx,
-                    type='ElementaryTypeName',
-                    name=ctx.getText())
+        return self._createNode(ctx=ctx,
+                                type='ElementaryTypeName',
+                                name=ctx.getText())
 
     def visitBlock(self, ctx):
-        return Node(ctx=ctx,
-                    type='Block',
-                    statements=self.visit(ctx.statement()))
+        return self._createNode(ctx=ctx,
+                                type='Block',
+                                statements=self.visit(ctx.statement()))
 
     def visitExpressionStatement(self, ctx):
-        return Node(ctx=ctx,
-                    type='ExpressionStatement',
-                    expression=self.visit(ctx.expression()))
+        return self._createNode(ctx=ctx,
+                                type='ExpressionStatement',
+                                expression=self.visit(ctx.expression()))
 
     def visitNumberLiteral(self, ctx):
         number = ctx.getChild(0).getText()
@@ -452,16 +531,16 @@ class AstVisitor(SolidityVisitor):
         if len(ctx.children) == 2:
             subdenomination = ctx.getChild(1).getText()
 
-        return Node(ctx=ctx,
-                    type='NumberLiteral',
-                    number=number,
-                    subdenomination=subdenomination)
+        return self._createNode(ctx=ctx,
+                                type='NumberLiteral',
+                                number=number,
+                                subdenomination=subdenomination)
 
     def visitMapping(self, ctx):
-        return Node(ctx=ctx,
-                    type='Mapping',
-                    keyType=self.visit(ctx.mappingKey()),
-                    valueType=self.visit(ctx.typeName()))
+        return self._createNode(ctx=ctx,
+                                type='Mapping',
+                                keyType=self.visit(ctx.mappingKey()),
+                                valueType=self.visit(ctx.typeName()))
 
     def visitModifierDefinition(self, ctx):
         parameters = []
@@ -473,11 +552,11 @@ class AstVisitor(SolidityVisitor):
         if ctx.identifier():
             name = ctx.identifier().getText()
 
-        return Node(ctx=ctx,
-                    type='ModifierDefinition',
-                    name=name,
-                    parameters=parameters,
-                    body=self.visit(ctx.block()))
+        return self._createNode(ctx=ctx,
+                                type='ModifierDefinition',
+                                name=name,
+                                parameters=parameters,
+                                body=self.visit(ctx.block()))
 
     def visitStatement(self, ctx):
         if ctx.children != None:
@@ -488,14 +567,14 @@ class AstVisitor(SolidityVisitor):
             return self.visit(ctx.getChild(0))
 
     def visitUncheckedStatement(self, ctx):
-        return Node(ctx=ctx,
-                    type='UncheckedStatement',
-                    body=self.visit(ctx.block()))
+        return self._createNode(ctx=ctx,
+                                type='UncheckedStatement',
+                                body=self.visit(ctx.block()))
 
     def visitRevertStatement(self, ctx):
-        return Node(ctx=ctx,
-                    type='RevertStatement',
-                    functionCall=self.visit(ctx.functionCall()))
+        return self._createNode(ctx=ctx,
+                                type='RevertStatement',
+                                functionCall=self.visit(ctx.functionCall()))
 
     def visitExpression(self, ctx):
         if ctx.children:
@@ -506,50 +585,50 @@ class AstVisitor(SolidityVisitor):
             elif children_length == 2:
                 op = ctx.getChild(0).getText()
                 if op == 'new':
-                    return Node(ctx=ctx,
-                                type='NewExpression',
-                                typeName=self.visit(ctx.typeName()))
+                    return self._createNode(ctx=ctx,
+                                            type='NewExpression',
+                                            typeName=self.visit(ctx.typeName()))
 
                 if op in ['+', '-', '++', '--', '!', '~', 'after', 'delete']:
-                    return Node(ctx=ctx,
-                                type='UnaryOperation',
-                                operator=op,
-                                subExpression=self.visit(ctx.getChild(1)),
-                                isPrefix=True)
+                    return self._createNode(ctx=ctx,
+                                            type='UnaryOperation',
+                                            operator=op,
+                                            subExpression=self.visit(ctx.getChild(1)),
+                                            isPrefix=True)
 
                 op = ctx.getChild(1).getText()
                 if op in ['++', '--']:
-                    return Node(ctx=ctx,
-                                type='UnaryOperation',
-                                operator=op,
-                                subExpression=self.visit(ctx.getChild(0)),
-                                isPrefix=False)
+                    return self._createNode(ctx=ctx,
+                                            type='UnaryOperation',
+                                            operator=op,
+                                            subExpression=self.visit(ctx.getChild(0)),
+                                            isPrefix=False)
             elif children_length == 3:
                 if ctx.getChild(0).getText() == '(' and ctx.getChild(2).getText() == ')':
-                    return Node(ctx=ctx,
-                                type='TupleExpression',
-                                components=[self.visit(ctx.getChild(1))],
-                                isArray=False)
+                    return self._createNode(ctx=ctx,
+                                            type='TupleExpression',
+                                            components=[self.visit(ctx.getChild(1))],
+                                            isArray=False)
 
                 op = ctx.getChild(1).getText()
 
                 if op == ',':
-                    return Node(ctx=ctx,
-                                type='TupleExpression',
-                                components=[
-                                    self.visit(ctx.getChild(0)),
-                                    self.visit(ctx.getChild(2))
-                                ],
-                                isArray=False)
+                    return self._createNode(ctx=ctx,
+                                            type='TupleExpression',
+                                            components=[
+                                                self.visit(ctx.getChild(0)),
+                                                self.visit(ctx.getChild(2))
+                                            ],
+                                            isArray=False)
 
 
                 elif op == '.':
                     expression = self.visit(ctx.getChild(0))
                     memberName = ctx.getChild(2).getText()
-                    return Node(ctx=ctx,
-                                type='MemberAccess',
-                                expression=expression,
-                                memberName=memberName)
+                    return self._createNode(ctx=ctx,
+                                            type='MemberAccess',
+                                            expression=expression,
+                                            memberName=memberName)
 
                 binOps = [
                     '+',
@@ -585,11 +664,11 @@ class AstVisitor(SolidityVisitor):
                 ]
 
                 if op in binOps:
-                    return Node(ctx=ctx,
-                                type='BinaryOperation',
-                                operator=op,
-                                left=self.visit(ctx.getChild(0)),
-                                right=self.visit(ctx.getChild(2)))
+                    return self._createNode(ctx=ctx,
+                                            type='BinaryOperation',
+                                            operator=op,
+                                            left=self.visit(ctx.getChild(0)),
+                                            right=self.visit(ctx.getChild(2)))
 
             elif children_length == 4:
 
@@ -605,26 +684,26 @@ class AstVisitor(SolidityVisitor):
                             args.append(self.visit(nameValue.expression()))
                             names.append(nameValue.identifier().getText())
 
-                    return Node(ctx=ctx,
-                                type='FunctionCall',
-                                expression=self.visit(ctx.getChild(0)),
-                                arguments=args,
-                                names=names)
+                    return self._createNode(ctx=ctx,
+                                            type='FunctionCall',
+                                            expression=self.visit(ctx.getChild(0)),
+                                            arguments=args,
+                                            names=names)
 
                 if ctx.getChild(1).getText() == '[' and ctx.getChild(3).getText() == ']':
-                    return Node(ctx=ctx,
-                                type='IndexAccess',
-                                base=self.visit(ctx.getChild(0)),
-                                index=self.visit(ctx.getChild(2)))
+                    return self._createNode(ctx=ctx,
+                                            type='IndexAccess',
+                                            base=self.visit(ctx.getChild(0)),
+                                            index=self.visit(ctx.getChild(2)))
 
             elif children_length == 5:
                 # ternary
                 if ctx.getChild(1).getText() == '?' and ctx.getChild(3).getText() == ':':
-                    return Node(ctx=ctx,
-                                type='Conditional',
-                                condition=self.visit(ctx.getChild(0)),
-                                TrueExpression=self.visit(ctx.getChild(2)),
-                                FalseExpression=self.visit(ctx.getChild(4)))
+                    return self._createNode(ctx=ctx,
+                                            type='Conditional',
+                                            condition=self.visit(ctx.getChild(0)),
+                                            TrueExpression=self.visit(ctx.getChild(2)),
+                                            FalseExpression=self.visit(ctx.getChild(4)))
 
             return self.visit(list(ctx.getChildren()))
 
@@ -664,10 +743,10 @@ class AstVisitor(SolidityVisitor):
                 isDeclaredConst=isDeclaredConst,
                 isIndexed=False)
 
-            return Node(ctx=ctx,
-                        type='StateVariableDeclaration',
-                        variables=[decl],
-                        initialValue=expression)
+            return self._createNode(ctx=ctx,
+                                    type='StateVariableDeclaration',
+                                    variables=[decl],
+                                    initialValue=expression)
 
     def visitForStatement(self, ctx):
         conditionExpression = self.visit(ctx.expressionStatement()) if ctx.expressionStatement() else None
@@ -675,65 +754,65 @@ class AstVisitor(SolidityVisitor):
         if conditionExpression:
             conditionExpression = conditionExpression.expression
 
-        return Node(ctx=ctx,
-                    type='ForStatement',
-                    initExpression=self.visit(ctx.simpleStatement()),
-                    conditionExpression=conditionExpression,
-                    loopExpression=Node(ctx=ctx,
-                        type='ExpressionStatement',
-                        expression=self.visit(ctx.expression())),
-                    body=self.visit(ctx.statement())
-                    )
+        return self._createNode(ctx=ctx,
+                                type='ForStatement',
+                                initExpression=self.visit(ctx.simpleStatement()),
+                                conditionExpression=conditionExpression,
+                                loopExpression=self._createNode(ctx=ctx,
+                                    type='ExpressionStatement',
+                                    expression=self.visit(ctx.expression())),
+                                body=self.visit(ctx.statement())
+                                )
 
     def visitPrimaryExpression(self, ctx):
         if ctx.BooleanLiteral():
-            return Node(ctx=ctx,
-                        type='BooleanLiteral',
-                        value=ctx.BooleanLiteral().getText() == 'true')
+            return self._createNode(ctx=ctx,
+                                    type='BooleanLiteral',
+                                    value=ctx.BooleanLiteral().getText() == 'true')
 
         if ctx.hexLiteral():
-            return Node(ctx=ctx,
-                        type='hexLiteral',
-                        value=ctx.hexLiteral().getText())
+            return self._createNode(ctx=ctx,
+                                    type='hexLiteral',
+                                    value=ctx.hexLiteral().getText())
 
         if ctx.stringLiteral():
             text = ctx.getText()
-            return Node(ctx=ctx,
-                        type='stringLiteral',
-                        value=text[1: len(text) - 1])
+            return self._createNode(ctx=ctx,
+                                    type='stringLiteral',
+                                    value=text[1: len(text) - 1])
 
         if ctx.children != None:
             if len(ctx.children) == 3 and ctx.getChild(1).getText() == '[' and ctx.getChild(2).getText() == ']':
                 node = self.visit(ctx.getChild(0))
                 if node.type == 'Identifier':
-                    node = Node(ctx=ctx,
-                                type='UserDefinedTypeName',
-                                namePath=node.name)
+                    node = self._createNode(ctx=ctx,
+                                            type='UserDefinedTypeName',
+                                            namePath=node.name)
                 else:
-                    node = Node(ctx=ctx,
-                                type='ElementaryTypeName',
-                                name=ctx.getChild(0).getText())
+                    node = self._createNode(ctx=ctx,
+                                            type='ElementaryTypeName',
+                                            name=ctx.getChild(0).getText())
 
-                return Node(ctx=ctx,
-                            type='ArrayTypeName',
-                            baseTypeName=node,
-                            length=None)
+                return self._createNode(ctx=ctx,
+                                        type='ArrayTypeName',
+                                        baseTypeName=node,
+                                        length=None)
 
             return self.visit(ctx.getChild(0))
 
     def visitIdentifier(self, ctx):
-        return Node(ctx=ctx,
-                    type="Identifier",
-                    name=ctx.getText())
+        return self._createNode(ctx=ctx,
+                                type="Identifier",
+                                name=ctx.getText())
 
     def visitTupleExpression(self, ctx):
         children = ctx.children[1:-1]
         components = [None if e is None else self.visit(e) for e in self._mapCommasToNulls(children)]
 
-        return Node(ctx=ctx,
-                    type='TupleExpression',
-                    components=components,
-                    isArray=ctx.getChild(0).getText() == '[')
+        return self._createNode(ctx=ctx,
+                                type='TupleExpression',
+                                components=components,
+                                isArray=ctx.getChild(0).getText() == '[')
 
     def visitIdentifierList(self, ctx: SolidityParser.IdentifierListContext):
         children = ctx.children[1:-1]
@@ -782,17 +861,17 @@ class AstVisitor(SolidityVisitor):
         if ctx.expression():
             initialValue = self.visit(ctx.expression())
 
-        return Node(ctx=ctx,
-                    type='VariableDeclarationStatement',
-                    variables=variables,
-                    initialValue=initialValue)
+        return self._createNode(ctx=ctx,
+                                type='VariableDeclarationStatement',
+                                variables=variables,
+                                initialValue=initialValue)
 
     def visitEventDefinition(self, ctx):
-        return Node(ctx=ctx,
-                    type='EventDefinition',
-                    name=ctx.identifier().getText(),
-                    parameters=self.visit(ctx.eventParameterList()),
-                    isAnonymous=not not ctx.AnonymousKeyword())
+        return self._createNode(ctx=ctx,
+                                type='EventDefinition',
+                                name=ctx.identifier().getText(),
+                                parameters=self.visit(ctx.eventParameterList()),
+                                isAnonymous=not not ctx.AnonymousKeyword())
 
     def visitEventParameterList(self, ctx):
         parameters = []
@@ -809,9 +888,9 @@ class AstVisitor(SolidityVisitor):
                 isStateVar=False,
                 isIndexed=not not paramCtx.IndexedKeyword()))
 
-        return Node(ctx=ctx,
-                    type='ParameterList',
-                    parameters=parameters)
+        return self._createNode(ctx=ctx,
+                                type='ParameterList',
+                                parameters=parameters)
 
     def visitInlineAssemblyStatement(self, ctx):
         language = None
@@ -820,38 +899,38 @@ class AstVisitor(SolidityVisitor):
             language = ctx.StringLiteralFragment().getText()
             language = language[1: len(language) - 1]
 
-        return Node(ctx=ctx,
-                    type='InLineAssemblyStatement',
-                    language=language,
-                    body=self.visit(ctx.assemblyBlock()))
+        return self._createNode(ctx=ctx,
+                                type='InLineAssemblyStatement',
+                                language=language,
+                                body=self.visit(ctx.assemblyBlock()))
 
     def visitAssemblyBlock(self, ctx):
         operations = [self.visit(it) for it in ctx.assemblyItem()]
 
-        return Node(ctx=ctx,
-                    type='AssemblyBlock',
-                    operations=operations)
+        return self._createNode(ctx=ctx,
+                                type='AssemblyBlock',
+                                operations=operations)
 
     def visitAssemblyItem(self, ctx):
 
         if ctx.hexLiteral():
-            return Node(ctx=ctx,
-                        type='HexLiteral',
-                        value=ctx.hexLiteral().getText())
+            return self._createNode(ctx=ctx,
+                                    type='HexLiteral',
+                                    value=ctx.hexLiteral().getText())
 
         if ctx.stringLiteral():
             text = ctx.stringLiteral().getText()
-            return Node(ctx=ctx,
-                        type='StringLiteral',
-                        value=text[1: len(text) - 1])
+            return self._createNode(ctx=ctx,
+                                    type='StringLiteral',
+                                    value=text[1: len(text) - 1])
 
         if ctx.BreakKeyword():
-            return Node(ctx=ctx,
-                        type='Break')
+            return self._createNode(ctx=ctx,
+                                    type='Break')
 
         if ctx.ContinueKeyword():
-            return Node(ctx=ctx,
-                        type='Continue')
+            return self._createNode(ctx=ctx,
+                                    type='Continue')
 
         return self.visit(ctx.getChild(0))
 
@@ -860,51 +939,51 @@ class AstVisitor(SolidityVisitor):
 
     def visitAssemblyMember(self, ctx):
         if type(ctx.identifier()) == list:
-            return Node(ctx=ctx,
-                        type='AssemblyMember',
-                        name=".".join([x.getText() for x in ctx.identifier() if x]))
+            return self._createNode(ctx=ctx,
+                                    type='AssemblyMember',
+                                    name=".".join([x.getText() for x in ctx.identifier() if x]))
         else:
-            return Node(ctx=ctx,
-                        type='AssemblyMember',
-                        name=ctx.identifier().getText())
+            return self._createNode(ctx=ctx,
+                                    type='AssemblyMember',
+                                    name=ctx.identifier().getText())
 
     def visitAssemblyCall(self, ctx):
         functionName = ctx.getChild(0).getText()
         args = [self.visit(arg) for arg in ctx.assemblyExpression()]
 
-        return Node(ctx=ctx,
-                    type='AssemblyExpression',
-                    functionName=functionName,
-                    arguments=args)
+        return self._createNode(ctx=ctx,
+                                type='AssemblyExpression',
+                                functionName=functionName,
+                                arguments=args)
 
     def visitAssemblyLiteral(self, ctx):
 
         if ctx.stringLiteral():
             text = ctx.getText()
-            return Node(ctx=ctx,
-                        type='StringLiteral',
-                        value=text[1: len(text) - 1])
+            return self._createNode(ctx=ctx,
+                                    type='StringLiteral',
+                                    value=text[1: len(text) - 1])
 
         if ctx.DecimalNumber():
-            return Node(ctx=ctx,
-                        type='DecimalNumber',
-                        value=ctx.getText())
+            return self._createNode(ctx=ctx,
+                                    type='DecimalNumber',
+                                    value=ctx.getText())
 
         if ctx.HexNumber():
-            return Node(ctx=ctx,
-                        type='HexNumber',
-                        value=ctx.getText())
+            return self._createNode(ctx=ctx,
+                                    type='HexNumber',
+                                    value=ctx.getText())
 
         if ctx.hexLiteral():
-            return Node(ctx=ctx,
-                        type='HexLiteral',
-                        value=ctx.getText())
+            return self._createNode(ctx=ctx,
+                                    type='HexLiteral',
+                                    value=ctx.getText())
 
     def visitAssemblySwitch(self, ctx):
-        return Node(ctx=ctx,
-                    type='AssemblySwitch',
-                    expression=self.visit(ctx.assemblyExpression()),
-                    cases=[self.visit(c) for c in ctx.assemblyCase()])
+        return self._createNode(ctx=ctx,
+                                type='AssemblySwitch',
+                                expression=self.visit(ctx.assemblyExpression()),
+                                cases=[self.visit(c) for c in ctx.assemblyCase()])
 
     def visitAssemblyCase(self, ctx):
         value = None
@@ -913,15 +992,15 @@ class AstVisitor(SolidityVisitor):
             value = self.visit(ctx.assemblyLiteral())
 
         if value != None:
-            node = Node(ctx=ctx,
-                        type="AssemblyCase",
-                        block=self.visit(ctx.assemblyBlock()),
-                        value=value)
+            node = self._createNode(ctx=ctx,
+                                    type="AssemblyCase",
+                                    block=self.visit(ctx.assemblyBlock()),
+                                    value=value)
         else:
-            node = Node(ctx=ctx,
-                        type="AssemblyCase",
-                        block=self.visit(ctx.assemblyBlock()),
-                        default=True)
+            node = self._createNode(ctx=ctx,
+                                    type="AssemblyCase",
+                                    block=self.visit(ctx.assemblyBlock()),
+                                    default=True)
 
         return node
 
@@ -933,10 +1012,10 @@ class AstVisitor(SolidityVisitor):
         else:
             names = self.visit(names.assemblyIdentifierList().identifier())
 
-        return Node(ctx=ctx,
-                    type='AssemblyLocalDefinition',
-                    names=names,
-                    expression=self.visit(ctx.assemblyExpression()))
+        return self._createNode(ctx=ctx,
+                                type='AssemblyLocalDefinition',
+                                names=names,
+                                expression=self.visit(ctx.assemblyExpression()))
 
     def visitAssemblyFunctionDefinition(self, ctx):
         args = ctx.assemblyIdentifierList().identifier()
@@ -944,12 +1023,12 @@ class AstVisitor(SolidityVisitor):
         if ctx.assemblyFunctionReturns():
             returnArgs = ctx.assemblyFunctionReturns().assemblyIdentifierList().identifier()
 
-        return Node(ctx=ctx,
-                    type='AssemblyFunctionDefinition',
-                    name=ctx.identifier().getText(),
-                    arguments=self.visit(args),
-                    returnArguments=self.visit(returnArgs),
-                    body=self.visit(ctx.assemblyBlock()))
+        return self._createNode(ctx=ctx,
+                                type='AssemblyFunctionDefinition',
+                                name=ctx.identifier().getText(),
+                                arguments=self.visit(args),
+                                returnArguments=self.visit(returnArgs),
+                                body=self.visit(ctx.assemblyBlock()))
 
     def visitAssemblyAssignment(self, ctx):
         names = ctx.assemblyIdentifierOrList()
@@ -959,42 +1038,42 @@ class AstVisitor(SolidityVisitor):
         elif names.assemblyIdentifierList():
             names = self.visit(names.assemblyIdentifierList().identifier())
 
-        return Node(ctx=ctx,
-                    type='AssemblyAssignment',
-                    names=names,
-                    expression=self.visit(ctx.assemblyExpression()))
+        return self._createNode(ctx=ctx,
+                                type='AssemblyAssignment',
+                                names=names,
+                                expression=self.visit(ctx.assemblyExpression()))
 
     def visitLabelDefinition(self, ctx):
-        return Node(ctx=ctx,
-                    type='LabelDefinition',
-                    name=ctx.identifier().getText())
+        return self._createNode(ctx=ctx,
+                                type='LabelDefinition',
+                                name=ctx.identifier().getText())
 
     def visitAssemblyStackAssignment(self, ctx):
-        return Node(ctx=ctx,
-                    type='AssemblyStackAssignment',
-                    name=ctx.identifier().getText())
+        return self._createNode(ctx=ctx,
+                                type='AssemblyStackAssignment',
+                                name=ctx.identifier().getText())
 
     def visitAssemblyFor(self, ctx):
-        return Node(ctx=ctx,
-                    type='AssemblyFor',
-                    pre=self.visit(ctx.getChild(1)),
-                    condition=self.visit(ctx.getChild(2)),
-                    post=self.visit(ctx.getChild(3)),
-                    body=self.visit(ctx.getChild(4)))
+        return self._createNode(ctx=ctx,
+                                type='AssemblyFor',
+                                pre=self.visit(ctx.getChild(1)),
+                                condition=self.visit(ctx.getChild(2)),
+                                post=self.visit(ctx.getChild(3)),
+                                body=self.visit(ctx.getChild(4)))
 
     def visitAssemblyIf(self, ctx):
-        return Node(ctx=ctx,
-                    type='AssemblyIf',
-                    condition=self.visit(ctx.assemblyExpression()),
-                    body=self.visit(ctx.assemblyBlock()))
+        return self._createNode(ctx=ctx,
+                                type='AssemblyIf',
+                                condition=self.visit(ctx.assemblyExpression()),
+                                body=self.visit(ctx.assemblyBlock()))
 
     ### /***************************************************
 
     def visitPragmaDirective(self, ctx):
-        return Node(ctx=ctx,
-                    type="PragmaDirective",
-                    name=ctx.pragmaName().getText(),
-                    value=ctx.pragmaValue().getText())
+        return self._createNode(ctx=ctx,
+                                type="PragmaDirective",
+                                name=ctx.pragmaName().getText(),
+                                value=ctx.pragmaValue().getText())
 
     def visitImportDirective(self, ctx):
         symbol_aliases = {}
@@ -1019,26 +1098,26 @@ class AstVisitor(SolidityVisitor):
         if ctx.importPath():
             path = ctx.importPath().getText().strip('"')
 
-        return Node(ctx=ctx,
-                    type="ImportDirective",
-                    path=path,
-                    symbolAliases=symbol_aliases,
-                    unitAlias=unit_alias
-                    )
+        return self._createNode(ctx=ctx,
+                                type="ImportDirective",
+                                path=path,
+                                symbolAliases=symbol_aliases,
+                                unitAlias=unit_alias
+                                )
 
     def visitContractDefinition(self, ctx):
         self._currentContract = ctx.identifier().getText()
-        return Node(ctx=ctx,
-                    type="ContractDefinition",
-                    name=ctx.identifier().getText(),
-                    baseContracts=self.visit(ctx.inheritanceSpecifier()),
-                    subNodes=self.visit(ctx.contractPart()),
-                    kind=ctx.getChild(0).getText())
+        return self._createNode(ctx=ctx,
+                                type="ContractDefinition",
+                                name=ctx.identifier().getText(),
+                                baseContracts=self.visit(ctx.inheritanceSpecifier()),
+                                subNodes=self.visit(ctx.contractPart()),
+                                kind=ctx.getChild(0).getText())
 
     def visitUserDefinedTypename(self, ctx):
-        return Node(ctx=ctx,
-                    type="UserDefinedTypename",
-                    name=ctx.getText())
+        return self._createNode(ctx=ctx,
+                                type="UserDefinedTypename",
+                                name=ctx.getText())
 
     def visitReturnStatement(self, ctx):
         return self.visit(ctx.expression())
@@ -1047,9 +1126,20 @@ class AstVisitor(SolidityVisitor):
         return ctx.getText()
 
 
-def parse(text, start="sourceUnit", loc=False, strict=False):
+def parse_tree(text, start="sourceUnit", strict=False, two_stage=False):
+    """
+    Runs the ANTLR parser and returns its parse tree
+
+    :param strict: stop at the first syntax error instead of recovering from it
+    :param two_stage: first try the faster SLL prediction and bail out at the first syntax error,
+                      then parse again with full LL prediction only if that fails
+    :return:
+    """
+    global SLL_PARSES
+    global LL_FALLBACKS
+
     from antlr4.InputStream import InputStream
-    from antlr4 import FileStream, CommonTokenStream
+    from antlr4 import CommonTokenStream
 
     input_stream = InputStream(text)
 
@@ -1058,16 +1148,50 @@ def parse(text, start="sourceUnit", loc=False, strict=False):
     token_stream = CommonTokenStream(lexer)
     parser = SolidityParser(token_stream)
     parser.removeErrorListeners()
-    ast = AstVisitor()
+
+    if two_stage:
+        parser._interp.predictionMode = PredictionMode.SLL
+        parser._errHandler = BailErrorStrategy()
+        try:
+            tree = getattr(parser, start)()
+            SLL_PARSES += 1
+            return tree
+        except ParseCancellationException:
+            # SLL prediction fails on syntax errors and on some valid input, which only full LL decides
+            LL_FALLBACKS += 1
+            parser.reset()
+            parser._interp.predictionMode = PredictionMode.LL
+
+    parser._errHandler = BailErrorStrategy() if strict else DefaultErrorStrategy()
+    try:
+        return getattr(parser, start)()
+    except ParseCancellationException as e:
+        raise Exception("syntax error at "+str(parser.getCurrentToken().line)+":"+str(parser.getCurrentToken().column)) from e
+
+
+def get_parse_statistics():
+    return SLL_PARSES, LL_FALLBACKS
+
+
+def reset_parse_statistics():
+    global SLL_PARSES
+    global LL_FALLBACKS
+
+    SLL_PARSES = 0
+    LL_FALLBACKS = 0
+
+
+def parse(text, start="sourceUnit", loc=False, strict=False, compact=False, two_stage=False):
+    ast = AstVisitor(compact=compact)
 
     Node.ENABLE_LOC = loc
 
-    return ast.visit(getattr(parser, start)())
+    return ast.visit(parse_tree(text, start=start, strict=strict, two_stage=two_stage))
 
 
-def parse_file(path, start="sourceUnit", loc=False, strict=False):
+def parse_file(path, start="sourceUnit", loc=False, strict=False, compact=False, two_stage=False):
     with open(path, 'r', encoding="utf-8") as f:
-        return parse(f.read(), start=start, loc=loc, strict=strict)
+        return parse(f.read(), start=start, loc=loc, strict=strict, compact=compact, two_stage=two_stage)
 
 
 def visit(node, callback_object):
@@ -1080,23 +1204,34 @@ def visit(node, callback_object):
     :return:
     """
 
-    if node is None or not isinstance(node, Node):
+    if node is None or not isinstance(node, NODE_CLASSES):
         return node
 
-    # call callback if it is available
-    if hasattr(callback_object, "visit"+node.type):
-        getattr(callback_object, "visit"+node.type)(node)
-
-    for k,v in node.items():
-        if k in node.NONCHILD_KEYS:
-            # skip non child items
+    # walk the tree in pre-order with an explicit stack instead of recursion
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None or not isinstance(node, NODE_CLASSES):
             continue
 
-        # item is array?
-        if isinstance(v, list):
-            [visit(child, callback_object) for child in v]
-        else:
-            visit(v, callback_object)
+        # call callback if it is available
+        if hasattr(callback_object, "visit"+node.type):
+            getattr(callback_object, "visit"+node.type)(node)
+
+        children = []
+        for k,v in node.items():
+            if k in node.NONCHILD_KEYS:
+                # skip non child items
+                continue
+
+            # item is array?
+            if isinstance(v, list):
+                children.extend(v)
+            else:
+                children.append(v)
+
+        # push in reverse so that children are visited in their original order
+        stack.extend(reversed(children))
 
 
 def objectify(start_node):
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import stat
+import pickle
+import hashlib
+import importlib.metadata
+
+from antlr4.atn.ATNState import ATNState
+from antlr4.atn.ATNSimulator import ATNSimulator
+from antlr4.atn.LexerATNSimulator import LexerATNSimulator
+from antlr4.atn.SemanticContext import SemanticContext
+from antlr4.dfa.DFA import DFA
+from antlr4.dfa.DFAState import DFAState
+from antlr4.PredictionContext import PredictionContext
+
+from utils.parser.parser import parse_tree
+from utils.parser.solidity_antlr4 import SolidityLexer
+from utils.parser.solidity_antlr4 import SolidityParser
+
+# Version of the format of the persisted prediction cache
+PREDICTION_CACHE_VERSION = 1
+
+# Fields of a DFA state besides its number and its edges
+DFA_STATE_FIELDS = ("configs", "isAcceptState", "prediction", "lexerActionExecutor", "requiresFullContext", "predicates")
+
+# Indexes of edges that do not point to a state of the same DFA
+NO_STATE = -1
+ERROR_STATE = -2
+
+
+def warm_up_prediction_cache(source_codes):
+    """
+    Parses the given source codes to fill the DFA caches of the lexer and parser, which are shared by
+    every parser of the process and inherited by forked worker processes
+    """
+    for source_code in source_codes:
+        try:
+            parse_tree(source_code, two_stage=True)
+        except Exception:
+            pass
+
+
+def get_prediction_cache_size():
+    return sum([len(dfa.states) for dfa in SolidityLexer.SolidityLexer.decisionsToDFA + SolidityParser.SolidityParser.decisionsToDFA])
+
+
+def get_prediction_cache_key():
+    # A persisted cache is only valid for the grammar and the ANTLR runtime it was built with
+    try:
+        runtime = importlib.metadata.version("antlr4-python3-runtime")
+    except importlib.metadata.PackageNotFoundError:
+        runtime = ""
+    grammar = repr(SolidityLexer.serializedATN())+repr(SolidityParser.serializedATN())
+    return hashlib.sha256((str(PREDICTION_CACHE_VERSION)+":"+runtime+":"+grammar).encode("utf-8")).hexdigest()
+
+
+def get_shared_objects(recognizer):
+    # Objects that the ANTLR runtime compares by identity and that must therefore not be copied
+    return [ATNSimulator.ERROR, LexerATNSimulator.ERROR, PredictionContext.EMPTY, SemanticContext.NONE] + list(recognizer.atn.lexerActions or [])
+
+
+class PredictionCachePickler(pickle.Pickler):
+
+    def __init__(self, file, recognizer):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared_objects = {id(shared_object): index for index, shared_object in enumerate(get_shared_objects(recognizer))}
+
+    def persistent_id(self, obj):
+        if isinstance(obj, ATNState):
+            return ("state", obj.stateNumber)
+        index = self.shared_objects.get(id(obj))
+        if index is not None:
+            return ("shared", index)
+        return None
+
+
+class PredictionCacheUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, recognizer=None):
+        super().__init__(file)
+        self.states = recognizer.atn.states if recognizer else list()
+        self.shared_objects = get_shared_objects(recognizer) if recognizer else list()
+
+    def persistent_load(self, pid):
+        kind, index = pid
+        if kind == "state":
+            return self.states[index]
+        return self.shared_objects[index]
+
+    def find_class(self, module, name):
+        # The cache only holds instances of classes of the ANTLR runtime, anything else is refused
+        if module.startswith("antlr4."):
+            cls = super().find_class(module, name)
+            if isinstance(cls, type) and cls.__module__ == module:
+                return cls
+        raise pickle.UnpicklingError("Prediction cache refers to unexpected class "+module+"."+name)
+
+
+def flatten_dfa(dfa):
+    # DFA states reference each other through their edges. They are stored as a flat list with edges
+    # given as indexes into that list, so that pickling does not recurse along paths of the DFA.
+    states = list()
+    indexes = dict()
+    stack = list(dfa.states) + ([dfa.s0] if dfa.s0 is not None else [])
+    while stack:
+        state = stack.pop()
+        if state is None or state is ATNSimulator.ERROR or state is LexerATNSimulator.ERROR or id(state) in indexes:
+            continue
+        indexes[id(state)] = len(states)
+        states.append(state)
+        stack.extend(state.edges or [])
+
+    def get_index(state):
+        if state is None:
+            return NO_STATE
+        if state is ATNSimulator.ERROR or state is LexerATNSimulator.ERROR:
+            return ERROR_STATE
+        return indexes[id(state)]
+
+    flattened_states = list()
+    for state in states:
+        edges = None if state.edges is None else [get_index(target) for target in state.edges]
+        flattened_states.append((state.stateNumber, edges, tuple(getattr(state, field) for field in DFA_STATE_FIELDS), state in dfa.states))
+    return flattened_states, get_index(dfa.s0)
+
+
+def restore_dfa(dfa, flattened_states, s0, error_state):
+    states = list()
+    for state_number, _, fields, _ in flattened_states:
+        state = DFAState(state_number, fields[0])
+        for field, value in zip(DFA_STATE_FIELDS[1:], fields[1:]):
+            setattr(state, field, value)
+        states.append(state)
+
+    def get_state(index):
+        if index == NO_STATE:
+            return None
+        if index == ERROR_STATE:
+            return error_state
+        return states[index]
+
+    dfa.states.clear()
+    for state, (_, edges, _, indexed) in zip(states, flattened_states):
+        if edges is not None:
+            state.edges = [get_state(index) for index in edges]
+        if indexed:
+            dfa.states[state] = state
+    dfa.s0 = get_state(s0)
+
+
+def reset_prediction_cache():
+    # Empty DFA caches, as right after importing the lexer and parser
+    for recognizer in (SolidityLexer.SolidityLexer, SolidityParser.SolidityParser):
+        recognizer.decisionsToDFA = [DFA(state, decision) for decision, state in enumerate(recognizer.atn.decisionToState)]
+
+
+def check_prediction_cache_permissions(path):
+    # The cache is unpickled, so it is only read if no other user can have written it
+    status = os.stat(path)
+    if hasattr(os, "getuid") and status.st_uid != os.getuid():
+        raise ValueError(path+" is not owned by the current user")
+    if status.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise ValueError(path+" is writable by other users")
+
+
+def save_prediction_cache(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    # Written to a temporary file first, so that concurrent readers never see a partial cache
+    temporary_path = path+"."+str(os.getpid())
+    with os.fdopen(os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+        pickle.dump(get_prediction_cache_key(), f)
+        for recognizer in (SolidityLexer.SolidityLexer, SolidityParser.SolidityParser):
+            PredictionCachePickler(f, recognizer).dump([flatten_dfa(dfa) for dfa in recognizer.decisionsToDFA])
+    os.replace(temporary_path, path)
+
+
+def load_prediction_cache(path):
+    """
+    Replaces the DFA caches of the lexer and parser with the ones persisted at path. Returns False if there is
+    no cache at path or if it was built for another grammar or ANTLR runtime. Raises an exception if the cache
+    cannot be read, in which case the lexer and parser are left with empty caches.
+    """
+    if not os.path.isfile(path):
+        return False
+    check_prediction_cache_permissions(path)
+    try:
+        with open(path, "rb") as f:
+            if PredictionCacheUnpickler(f).load() != get_prediction_cache_key():
+                return False
+            caches = list()
+            for recognizer in (SolidityLexer.SolidityLexer, SolidityParser.SolidityParser):
+                caches.append((recognizer, PredictionCacheUnpickler(f, recognizer).load()))
+        for recognizer, dfas in caches:
+            error_state = LexerATNSimulator.ERROR if recognizer is SolidityLexer.SolidityLexer else ATNSimulator.ERROR
+            for dfa, (flattened_states, s0) in zip(recognizer.decisionsToDFA, dfas):
+                restore_dfa(dfa, flattened_states, s0, error_state)
+    except Exception:
+        reset_prediction_cache()
+        raise
+    return True
@@ -1,5 +1,7 @@
 import os
 
+# Fingerprint store used to store and match fingerprints
+BACKEND = "elasticsearch"
 # Elasticsearch mapping
 ELASTICSEARCH_MAPPING = os.path.dirname(__file__)+"/elasticsearch/mapping.json"
 # Elasticsearch timeout
@@ -10,15 +12,68 @@ ELASTICSEARCH_MAX_RESULTS = 1000
 ELASTICSEARCH_HOST = "http://localhost"
 # Elasticsearch port
 ELASTICSEARCH_PORT = 9200
+# Elasticsearch number of connections kept open per node and process
+ELASTICSEARCH_POOL_SIZE = 10
+# Elasticsearch keep connections alive between requests
+ELASTICSEARCH_KEEP_ALIVE = True
+# Elasticsearch gzip compression of request bodies
+ELASTICSEARCH_HTTP_COMPRESS = True
+# Elasticsearch number of queries per multi-search request
+ELASTICSEARCH_MSEARCH_SIZE = 50
 # Elasticsearch clear index
 ELASTICSEARCH_CLEAR_INDEX = True
+# Elasticsearch number of documents per bulk request
+ELASTICSEARCH_BULK_SIZE = 500
+# Elasticsearch number of document ids per multi-get request
+ELASTICSEARCH_MGET_SIZE = 1000
+# Directory of the indexes of the embedded fingerprint stores
+INDEX_DIRECTORY = os.path.join(os.path.expanduser("~"), ".ccd", "indexes")
+# SQLite file of the indexes of the sqlite fingerprint store
+SQLITE_INDEX_FILE = os.path.join(os.path.expanduser("~"), ".ccd", "fingerprints.sqlite")
+# SQLite timeout in seconds when waiting for concurrent writers
+SQLITE_TIMEOUT = 60
+# Number of MinHash permutations of the signatures of the lsh fingerprint store
+LSH_PERMUTATIONS = 128
+# Number of LSH bands and rows per band, derived from NGRAM_THRESHOLD if not set
+LSH_BANDS = None
+LSH_ROWS = None
+# Weight of missed matches against retrieved non-matches when deriving the LSH bands and rows
+LSH_FALSE_NEGATIVE_WEIGHT = 0.5
+# Fingerprint cache
+FINGERPRINT_CACHE = True
+# Fingerprint cache file
+FINGERPRINT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".ccd", "fingerprint_cache.sqlite")
+# Fingerprint cache maximum number of entries
+FINGERPRINT_CACHE_MAX_ENTRIES = 1000000
+# Fingerprint cache number of insertions between checks for eviction
+FINGERPRINT_CACHE_EVICTION_INTERVAL = 1000
+# Fingerprint cache timeout in seconds when waiting for concurrent writers
+FINGERPRINT_CACHE_TIMEOUT = 60
+# Maximum number of memoized token hashes per process
+TOKEN_HASH_CACHE_SIZE = 100000
+# Build the AST from compact slotted nodes instead of dictionaries
+COMPACT_AST = True
+# Parse with SLL prediction first and fall back to full LL prediction only when it fails
+TWO_STAGE_PARSING = True
+# Report a parsing error at the first syntax error instead of recovering from it
+STRICT_PARSING = False
+# Number of files parsed before forking worker processes, so that they inherit a warm ANTLR prediction cache
+PARSER_WARM_UP_FILES = 20
+# Persist the ANTLR prediction cache between runs (disable with --no-prediction-cache)
+PREDICTION_CACHE = True
+# Directory of the caches reused between runs, only accessible by its owner
+CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".ccd", "cache")
+# Prediction cache file, only read if no other user can write it
+PREDICTION_CACHE_FILE = os.path.join(CACHE_DIRECTORY, "prediction_cache.pickle")
 # Ngram size
 NGRAM_SIZE = 3
 # Ngram threshold
 NGRAM_THRESHOLD = 0.5
 # Levenshtein threshold
 LEVENSHTEIN_TRESHOLD = 0.7
+# Number of processes used to rerank match candidates
+RERANK_JOBS = 1
 # Debugging mode
 DEBUG_MODE = False
-# Python recursion limit
+# Python recursion limit, required by the recursive descent of the ANTLR parser and AST visitor
 PYTHON_RECURSION_LIMIT = 3000
@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 import re
+import numpy
+import hashlib
 
 from difflib import SequenceMatcher
 
@@ -11,12 +13,78 @@ class colors:
     FAIL = '\033[91m'
     END = '\033[0m'
 
+# Characters terminating a sequence of the normalized source code
+SEQUENCE_DELIMITERS = str.maketrans("{}", ";;")
+
+def split_normalized_source_code(normalized_source_code):
+    # Returns the sequences terminated by '{', ';' or '}', text after the last delimiter is dropped
+    return normalized_source_code.translate(SEQUENCE_DELIMITERS).split(";")[:-1]
+
+# Operators separated from the surrounding tokens of a statement, parentheses and spaces separate tokens.
+# '!=' directly followed by '=' yields '!' so that the following '==' is kept together.
+TOKEN_PATTERN = re.compile(r"(&&|\|\||>=|<=|==|!=(?!=)|returns|[><.+\-/*,!])|[ (]")
+
+# Compound operators whose characters end up as separate tokens
+SPLIT_OPERATORS = {">=": [">", "="], "<=": ["<", "="], "!=": ["!", "="]}
+
+def split_sequence_into_tokens(sequence):
+    tokens = list()
+    for token in TOKEN_PATTERN.split(sequence.replace(")", "")):
+        if token:
+            if token in SPLIT_OPERATORS:
+                tokens += SPLIT_OPERATORS[token]
+            else:
+                tokens.append(token)
+    return tokens
+
 def generate_ngrams(text, n):
     ngrams = list()
     for i in range(len(text) - n + 1):
         ngrams.append(text[i:i+n])
     return ngrams
 
+def generate_ngram_keys(text, n):
+    # Encodes every n-gram of the text as an unsigned 64-bit integer. N-grams of up to three characters
+    # are packed losslessly with 21 bits per code point, longer ones are hashed. The encoding only
+    # depends on n, so that the keys of any two texts can be compared.
+    size = len(text) - n + 1
+    if size <= 0:
+        return numpy.empty(0, dtype=numpy.uint64)
+    if n * 21 <= 64:
+        characters = numpy.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype="<u4").astype(numpy.uint64)
+        keys = numpy.zeros(size, dtype=numpy.uint64)
+        for i in range(n):
+            keys = (keys << numpy.uint64(21)) | characters[i:i+size]
+        return keys
+    return numpy.array([int.from_bytes(hashlib.blake2b(ngram.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little") for ngram in generate_ngrams(text, n)], dtype=numpy.uint64)
+
+def count_ngram_matches(keys, candidate_keys, distinct=False):
+    # Number of the n-gram keys (counted with repetitions) that occur at least once in each of the
+    # candidate key arrays, computed for all candidates at once. Set distinct if no candidate key array
+    # contains a key twice.
+    unique_keys, counts = numpy.unique(keys, return_counts=True)
+    owners = numpy.repeat(numpy.arange(len(candidate_keys), dtype=numpy.int64), [len(k) for k in candidate_keys])
+    all_candidate_keys = numpy.concatenate(candidate_keys)
+    positions = numpy.searchsorted(unique_keys, all_candidate_keys)
+    found = positions < len(unique_keys)
+    found[found] = unique_keys[positions[found]] == all_candidate_keys[found]
+    if distinct:
+        return numpy.bincount(owners[found], weights=counts[positions[found]], minlength=len(candidate_keys))
+    # Every distinct n-gram is only counted once per candidate
+    pairs = numpy.unique(owners[found] * len(unique_keys) + positions[found])
+    return numpy.bincount(pairs // len(unique_keys), weights=counts[pairs % len(unique_keys)], minlength=len(candidate_keys))
+
+def score_ngram_overlap(text, candidates, n):
+    # Percentage of the n-grams of the text (counted with repetitions) that occur at least once
+    # in each candidate, computed for all candidates at once
+    if not candidates:
+        return list()
+    keys = generate_ngram_keys(text, n)
+    if not len(keys):
+        raise ValueError("Text of length "+str(len(text))+" has no n-grams of size "+str(n))
+    matches = count_ngram_matches(keys, [generate_ngram_keys(candidate, n) for candidate in candidates])
+    return (matches / len(keys) * 100.0).tolist()
+
 def remove_comments(string):
     pattern = r"(\".*?\"|\'.*?\')|(/\*.*?\*/|//[^\r\n]*$)"
     # first group captures quoted strings (double or single)
@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gc
+import io
+import os
+import sys
+import time
+import types
+import argparse
+import tempfile
+import multiprocessing
+import tracemalloc
+import contextlib
+import concurrent.futures
+import subprocess
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CCD'))
+
+import CCD
+
+from utils import settings
+from utils import backends
+from utils.fingerprint import Fingerprint
+from utils.parser import parser
+from utils.utils import colors, remove_comments, remove_assembly, generate_ngrams, generate_ngram_keys
+
+DATASET = "dataset/honeypots/source_code"
+
+def find_dataset_files(directory, limit=None):
+    file_paths = list()
+    for path, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(".sol"):
+                file_paths.append(os.path.join(path, name))
+    file_paths.sort()
+    if limit:
+        file_paths = file_paths[:limit]
+    return file_paths
+
+def normalize_dataset(file_paths):
+    normalized_source_codes = dict()
+    for file_path in file_paths:
+        with open(file_path, "r") as f:
+            source_code = f.read()
+        with contextlib.redirect_stdout(io.StringIO()):
+            normalized_source_codes[file_path], _ = CCD.normalize_source_code(source_code, file_path)
+    return normalized_source_codes
+
+def generate_fingerprints(file_paths):
+    fingerprints = dict()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for file_path in file_paths:
+            fingerprints[file_path] = CCD.generate_fingerprint(file_path)["fingerprint"]
+    return fingerprints
+
+def compare_fingerprints(reference, fingerprints):
+    differences = [file_path for file_path in reference if reference[file_path] != fingerprints[file_path]]
+    if differences:
+        print(colors.FAIL+str(len(differences))+" fingerprint(s) differ:"+colors.END)
+        for file_path in differences:
+            print(colors.FAIL+file_path+colors.END)
+    else:
+        print(colors.OK+"All "+str(len(reference))+" fingerprints are byte-identical."+colors.END)
+    return not differences
+
+def measure(function, arguments, repetitions):
+    best = None
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        for argument in arguments:
+            function(argument)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def print_speedup(name, reference_time, new_time):
+    print(name+":", colors.INFO+"{:.4f}".format(reference_time)+colors.END, "second(s) before,", colors.INFO+"{:.4f}".format(new_time)+colors.END, "second(s) after", "("+colors.INFO+"{:.2f}x".format(reference_time / new_time if new_time else 0.0)+colors.END+")")
+
+def split_sequence_into_tokens_reference(sequence):
+    # Successive passes used before the single-pass tokenizer
+    pieces = [x for x in sequence.replace(")", "").split("(") if x]
+    for operator in ["&&", "||", ">=", "<=", "==", "!=", ">", "<", ".", "+", "-", "/", "*", ",", "!"]:
+        pieces = [x for piece in pieces for x in piece.replace(operator, " "+operator+" ").split(" ")]
+    return [x for piece in pieces for x in piece.replace("returns", " returns ").split(" ") if x]
+
+def benchmark_tokenizer(args):
+    file_paths = find_dataset_files(args.dataset, args.limit)
+    print("Normalizing", colors.INFO+str(len(file_paths))+colors.END, "file(s)...")
+    normalized_source_codes = normalize_dataset(file_paths)
+
+    # Differential test on every statement of the dataset
+    sequences = [sequence for normalized_source_code in normalized_source_codes.values() for sequence in CCD.split_normalized_source_code(normalized_source_code) if "(" in sequence and ")" in sequence]
+    mismatches = [sequence for sequence in sequences if split_sequence_into_tokens_reference(sequence) != CCD.split_sequence_into_tokens(sequence)]
+    if mismatches:
+        print(colors.FAIL+str(len(mismatches))+" of "+str(len(sequences))+" statement(s) are tokenized differently, e.g.: "+mismatches[0]+colors.END)
+    else:
+        print(colors.OK+"All "+str(len(sequences))+" statements are tokenized identically."+colors.END)
+
+    # Differential test on the generated fingerprints
+    settings.FINGERPRINT_CACHE = False
+    fingerprints = generate_fingerprints(file_paths)
+    split_sequence_into_tokens = CCD.split_sequence_into_tokens
+    CCD.split_sequence_into_tokens = split_sequence_into_tokens_reference
+    try:
+        reference = generate_fingerprints(file_paths)
+    finally:
+        CCD.split_sequence_into_tokens = split_sequence_into_tokens
+    identical = compare_fingerprints(reference, fingerprints)
+
+    # Micro-benchmark on the statements of the largest contracts
+    largest = sorted(normalized_source_codes, key=lambda file_path: len(normalized_source_codes[file_path]), reverse=True)[:args.largest]
+    sequences = [sequence for file_path in largest for sequence in CCD.split_normalized_source_code(normalized_source_codes[file_path]) if "(" in sequence and ")" in sequence]
+    print("Tokenizing", colors.INFO+str(len(sequences))+colors.END, "statement(s) of the", colors.INFO+str(len(largest))+colors.END, "largest contract(s)...")
+    print_speedup("Tokenization", measure(split_sequence_into_tokens_reference, sequences, args.repetitions), measure(CCD.split_sequence_into_tokens, sequences, args.repetitions))
+
+    return identical and not mismatches
+
+def split_normalized_source_code_reference(normalized_source_code):
+    # Per-character loop used before the segmenter
+    sequences = list()
+    sequence = ""
+    for character in normalized_source_code:
+        if character in ["{", ";", "}"]:
+            sequences.append(sequence)
+            sequence = ""
+        else:
+            sequence += character
+    return sequences
+
+def benchmark_segmenter(args):
+    file_paths = find_dataset_files(args.dataset, args.limit)
+    print("Normalizing", colors.INFO+str(len(file_paths))+colors.END, "file(s)...")
+    normalized_source_codes = list(normalize_dataset(file_paths).values())
+
+    # Differential test on every normalized source code of the dataset
+    mismatches = [normalized_source_code for normalized_source_code in normalized_source_codes if split_normalized_source_code_reference(normalized_source_code) != CCD.split_normalized_source_code(normalized_source_code)]
+    if mismatches:
+        print(colors.FAIL+str(len(mismatches))+" of "+str(len(normalized_source_codes))+" normalized source code(s) are split differently."+colors.END)
+    else:
+        print(colors.OK+"All "+str(len(normalized_source_codes))+" normalized source codes are split identically."+colors.END)
+
+    print("Splitting", colors.INFO+str(sum([len(normalized_source_code) for normalized_source_code in normalized_source_codes]))+colors.END, "character(s) of normalized source code...")
+    print_speedup("Segmentation", measure(split_normalized_source_code_reference, normalized_source_codes, args.repetitions), measure(CCD.split_normalized_source_code, normalized_source_codes, args.repetitions))
+
+    return not mismatches
+
+def load_reference_module(revision, path, name):
+    # Loads a previous implementation of a module from the git history
+    source_code = subprocess.check_output(["git", "show", revision+":"+path], cwd=os.path.dirname(os.path.abspath(__file__)))
+    module = types.ModuleType(name)
+    exec(compile(source_code, revision+":"+path, "exec"), module.__dict__)
+    return module
+
+def parse_dataset(file_paths, compact=False):
+    source_units = dict()
+    for file_path in file_paths:
+        with open(file_path, "r") as f:
+            source_code = f.read()
+        source_code = remove_comments(remove_assembly(CCD.html.unescape(source_code))).replace("\n", "")
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                source_units[file_path] = parser.parse(source_code, loc=False, compact=compact)
+        except Exception:
+            pass
+    return source_units
+
+def normalize_source_unit(normalizer, source_unit):
+    # Supports the normalizer class as well as the original module-level implementation
+    if hasattr(normalizer, "Normalizer"):
+        instance = normalizer.Normalizer()
+        output = list()
+        for child in source_unit.children:
+            instance.normalize_child(child, output)
+        return "".join(output)
+    normalizer.clear_parser_identifiers()
+    normalized_source_code = ""
+    for child in source_unit.children:
+        normalized_source_code += normalizer.normalize_child(child)
+    return normalized_source_code
+
+def measure_peak_memory(function, arguments):
+    peak = 0
+    for argument in arguments:
+        tracemalloc.start()
+        function(argument)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return peak
+
+def benchmark_normalizer(args):
+    from utils import normalizer
+    if args.revision:
+        reference = load_reference_module(args.revision, "CCD/utils/normalizer/__init__.py", "reference_normalizer")
+    else:
+        import reference_normalizer as reference
+
+    file_paths = find_dataset_files(args.dataset, args.limit)
+    print("Parsing", colors.INFO+str(len(file_paths))+colors.END, "file(s)...")
+    source_units = parse_dataset(file_paths)
+
+    # Differential test on every parsed file of the dataset
+    mismatches = [file_path for file_path in source_units if normalize_source_unit(reference, source_units[file_path]) != normalize_source_unit(normalizer, source_units[file_path])]
+    if mismatches:
+        print(colors.FAIL+str(len(mismatches))+" of "+str(len(source_units))+" file(s) are normalized differently, e.g.: "+mismatches[0]+colors.END)
+    else:
+        print(colors.OK+"All "+str(len(source_units))+" parsed files are normalized identically to "+(("revision "+args.revision) if args.revision else "the original normalizer")+"."+colors.END)
+
+    # Differential test of concurrent normalization in threads of a single process
+    if hasattr(normalizer, "Normalizer") and args.threads > 1:
+        sequential = {file_path: normalize_source_unit(normalizer, source_units[file_path]) for file_path in source_units}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.threads) as executor:
+            concurrent_results = dict(zip(source_units, executor.map(lambda file_path: normalize_source_unit(normalizer, source_units[file_path]), source_units)))
+        concurrent_mismatches = [file_path for file_path in source_units if sequential[file_path] != concurrent_results[file_path]]
+        if concurrent_mismatches:
+            print(colors.FAIL+str(len(concurrent_mismatches))+" file(s) are normalized differently by "+str(args.threads)+" threads, e.g.: "+concurrent_mismatches[0]+colors.END)
+        else:
+            print(colors.OK+"All "+str(len(source_units))+" parsed files are normalized identically by "+str(args.threads)+" threads."+colors.END)
+        mismatches += concurrent_mismatches
+
+    largest = sorted(source_units, key=lambda file_path: len(normalize_source_unit(normalizer, source_units[file_path])), reverse=True)[:args.largest]
+    print("Normalizing the", colors.INFO+str(len(largest))+colors.END, "largest contract(s)...")
+    print_speedup("Normalization", measure(lambda file_path: normalize_source_unit(reference, source_units[file_path]), largest, args.repetitions), measure(lambda file_path: normalize_source_unit(normalizer, source_units[file_path]), largest, args.repetitions))
+    reference_peak = measure_peak_memory(lambda file_path: normalize_source_unit(reference, source_units[file_path]), largest)
+    peak = measure_peak_memory(lambda file_path: normalize_source_unit(normalizer, source_units[file_path]), largest)
+    print("Peak memory:", colors.INFO+str(reference_peak)+colors.END, "byte(s) before,", colors.INFO+str(peak)+colors.END, "byte(s) after")
+
+    return not mismatches
+
+def outline_source_unit(source_unit):
+    source_unit_object = parser.objectify(source_unit)
+    return [(name, sorted(contract.functions), sorted(contract.modifiers), sorted(contract.stateVars)) for name, contract in source_unit_object.contracts.items()]
+
+def measure_retained_memory(function, arguments):
+    # Memory still allocated by the results of function once garbage has been collected
+    retained = 0
+    for argument in arguments:
+        gc.collect()
+        tracemalloc.start()
+        result = function(argument)
+        gc.collect()
+        retained += tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del result
+    return retained
+
+def measure_collection(source_units):
+    # Time of a full garbage collection while the given trees are alive
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        gc.collect()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def benchmark_ast(args):
+    from utils import normalizer
+
+    file_paths = find_dataset_files(args.dataset, args.limit)
+    print("Parsing", colors.INFO+str(len(file_paths))+colors.END, "file(s)...")
+    source_units = parse_dataset(file_paths)
+    compact_source_units = parse_dataset(file_paths, compact=True)
+
+    # Differential test of the normalizer and objectify on both node representations
+    mismatches = list()
+    for file_path in source_units:
+        if file_path not in compact_source_units:
+            mismatches.append(file_path)
+        elif normalize_source_unit(normalizer, source_units[file_path]) != normalize_source_unit(normalizer, compact_source_units[file_path]):
+            mismatches.append(file_path)
+        elif outline_source_unit(source_units[file_path]) != outline_source_unit(compact_source_units[file_path]):
+            mismatches.append(file_path)
+    if mismatches:
+        print(colors.FAIL+str(len(mismatches))+" of "+str(len(source_units))+" file(s) differ between dictionary and compact nodes, e.g.: "+mismatches[0]+colors.END)
+    else:
+        print(colors.OK+"All "+str(len(source_units))+" parsed files are normalized and objectified identically from compact nodes."+colors.END)
+
+    largest = sorted(source_units, key=os.path.getsize, reverse=True)[:args.largest]
+    source_units.clear()
+    compact_source_units.clear()
+    gc.collect()
+    print("Parsing the", colors.INFO+str(len(largest))+colors.END, "largest contract(s)...")
+    print_speedup("Parsing", measure(lambda file_path: parse_dataset([file_path]), largest, args.repetitions), measure(lambda file_path: parse_dataset([file_path], compact=True), largest, args.repetitions))
+    retained = measure_retained_memory(lambda file_path: parse_dataset([file_path]), largest)
+    compact_retained = measure_retained_memory(lambda file_path: parse_dataset([file_path], compact=True), largest)
+    print("AST memory:", colors.INFO+str(retained)+colors.END, "byte(s) with dictionaries,", colors.INFO+str(compact_retained)+colors.END, "byte(s) with compact nodes", "("+colors.INFO+"{:.2f}x".format(retained / compact_retained if compact_retained else 0.0)+colors.END+")")
+    print_speedup("Normalization", measure(lambda source_unit: normalize_source_unit(normalizer, source_unit), parse_dataset(largest).values(), args.repetitions), measure(lambda source_unit: normalize_source_unit(normalizer, source_unit), parse_dataset(largest, compact=True).values(), args.repetitions))
+    trees = parse_dataset(largest)
+    collection = measure_collection(trees)
+    trees = parse_dataset(largest, compact=True)
+    print_speedup("Garbage collection with the trees alive", collection, measure_collection(trees))
+
+    return not mismatches
+
+def normalize_file(file_path):
+    with open(file_path, "r") as f:
+        source_code = f.read()
+    with contextlib.redirect_stdout(io.StringIO()):
+        return CCD.normalize_source_code(source_code, file_path)
+
+def preprocess_file(file_path):
+    with open(file_path, "r") as f:
+        return CCD.preprocess_source_code(f.read())
+
+def parse_source_code(source_code, strict=False, two_stage=False):
+    try:
+        parser.parse_tree(source_code, strict=strict, two_stage=two_stage)
+        return True
+    except Exception:
+        return False
+
+def benchmark_parsing(args):
+    file_paths = find_dataset_files(args.dataset, args.limit)
+    print("Normalizing", colors.INFO+str(len(file_paths))+colors.END, "file(s) with both parsing modes...")
+
+    # Differential test of the normalized source code and the reported errors on every file of the dataset
+    settings.TWO_STAGE_PARSING = False
+    reference = {file_path: normalize_file(file_path) for file_path in file_paths}
+    settings.TWO_STAGE_PARSING = True
+    sll_parses, ll_fallbacks = parser.get_parse_statistics()
+    mismatches = [file_path for file_path in file_paths if reference[file_path] != normalize_file(file_path)]
+    sll_parses, ll_fallbacks = parser.get_parse_statistics()[0] - sll_parses, parser.get_parse_statistics()[1] - ll_fallbacks
+    if mismatches:
+        print(colors.FAIL+str(len(mismatches))+" of "+str(len(file_paths))+" file(s) are normalized differently with SLL prediction, e.g.: "+mismatches[0]+colors.END)
+    else:
+        print(colors.OK+"All "+str(len(file_paths))+" files are normalized identically, with identical errors, with SLL prediction."+colors.END)
+    CCD.print_parse_statistics(sll_parses, ll_fallbacks)
+
+    source_codes = {file_path: preprocess_file(file_path) for file_path in file_paths}
+    largest = sorted(file_paths, key=lambda file_path: len(source_codes[file_path]), reverse=True)[:args.largest]
+    print("Parsing the", colors.INFO+str(len(largest))+colors.END, "largest contract(s)...")
+    print_speedup("Parsing", measure(lambda file_path: parse_source_code(source_codes[file_path]), largest, args.repetitions), measure(lambda file_path: parse_source_code(source_codes[file_path], two_stage=True), largest, args.repetitions))
+
+    # Files with syntax errors, on which strict parsing fails fast instead of recovering
+    malformed = [file_path for file_path in file_paths if not parse_source_code(source_codes[file_path], strict=True)]
+    print("Parsing the", colors.INFO+str(len(malformed))+colors.END, "file(s) with syntax errors...")
+    if malformed:
+        print_speedup("Parsing with recovery before, strict parsing after", measure(lambda file_path: parse_source_code(source_codes[file_path], two_stage=True), malformed, args.repetitions), measure(lambda file_path: parse_source_code(source_codes[file_path], strict=True, two_stage=True), malformed, args.repetitions))
+
+    return not mismatches
+
+def warm_up_in_fresh_process(file_paths, prediction_cache_file):
+    sys.setrecursionlimit(settings.PYTHON_RECURSION_LIMIT)
+    from utils.parser import prediction_cache
+    start = time.perf_counter()
+    prediction_cache.warm_up_prediction_cache([preprocess_file(file_path) for file_path in file_paths])
+    prediction_cache.save_prediction_cache(prediction_cache_file)
+    return time.perf_counter() - start, prediction_cache.get_prediction_cache_size()
+
+def parse_in_fresh_process(file_paths, prediction_cache_file=None):
+    sys.setrecursionlimit(settings.PYTHON_RECURSION_LIMIT)
+    from utils.parser import prediction_cache
+    start = time.perf_counter()
+    if prediction_cache_file:
+        prediction_cache.load_prediction_cache(prediction_cache_file)
+    load_time = time.perf_counter() - start
+    source_codes = [preprocess_file(file_path) for file_path in file_paths]
+    trees = list()
+    start = time.perf_counter()
+    for source_code in source_codes:
+        try:
+            trees.append(parser.parse_tree(source_code, two_stage=True).toStringTree(recog=parser.SolidityParser))
+        except Exception as e:
+            trees.append("Parsing error: "+str(e))
+    return load_time, time.perf_counter() - start, trees
+
+def benchmark_prediction_cache(args):
+    file_paths = find_dataset_files(args.dataset, args.limit)
+    step = max(1, len(file_paths) // args.seed_files)
+    seed_file_paths = file_paths[::step][:args.seed_files]
+    file_paths = [file_path for file_path in file_paths if file_path not in seed_file_paths]
+
+    # Every measurement runs in a freshly spawned process, which starts with an empty prediction cache
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        prediction_cache_file = os.path.join(directory, "prediction_cache.pickle")
+        with context.Pool(1) as pool:
+            warm_up_time, size = pool.apply(warm_up_in_fresh_process, (seed_file_paths, prediction_cache_file))
+        print("Warmed up the parser with", colors.INFO+str(len(seed_file_paths))+colors.END, "file(s) in", colors.INFO+"{:.4f}".format(warm_up_time)+colors.END, "second(s):", colors.INFO+str(size)+colors.END, "DFA state(s),", colors.INFO+str(os.path.getsize(prediction_cache_file))+colors.END, "byte(s) persisted.")
+
+        cold_time, warm_time, load_time, trees, cold_trees = None, None, None, None, None
+        for _ in range(args.repetitions):
+            with context.Pool(1) as pool:
+                _, elapsed, cold_trees = pool.apply(parse_in_fresh_process, (file_paths, ))
+            cold_time = elapsed if cold_time is None else min(cold_time, elapsed)
+            with context.Pool(1) as pool:
+                elapsed_load, elapsed, trees = pool.apply(parse_in_fresh_process, (file_paths, prediction_cache_file))
+            warm_time = elapsed if warm_time is None else min(warm_time, elapsed)
+            load_time = elapsed_load if load_time is None else min(load_time, elapsed_load)
+
+    mismatches = [file_path for file_path, cold_tree, tree in zip(file_paths, cold_trees, trees) if cold_tree != tree]
+    if mismatches:
+        print(colors.FAIL+str(len(mismatches))+" of "+str(len(file_paths))+" file(s) are parsed differently with the persisted prediction cache, e.g.: "+mismatches[0]+colors.END)
+    else:
+        print(colors.OK+"All "+str(len(file_paths))+" files are parsed into identical trees with the persisted prediction cache."+colors.END)
+    print("Loading the prediction cache:", colors.INFO+"{:.4f}".format(load_time)+colors.END, "second(s)")
+    print_speedup("Parsing the remaining files", cold_time, warm_time)
+
+    return not mismatches
+
+def generate_documents(file_paths):
+    documents = list()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for file_path in file_paths:
+            document = CCD.generate_fingerprint(file_path)
+            if document["fingerprint"]:
+                documents.append(document)
+    return documents
+
+def get_reference_candidates(document_ngrams, fingerprint, threshold, copies):
+    # Brute-force evaluation of an Elasticsearch match query with minimum_should_match over every document
+    ngrams = generate_ngrams(fingerprint, settings.NGRAM_SIZE)
+    if not ngrams:
+        return list()
+    required = max(1, backends.get_minimum_should_match(len(ngrams), threshold))
+    candidates = list()
+    for file_path, ngram_set in document_ngrams:
+        if sum([ngram in ngram_set for ngram in ngrams]) >= required:
+            candidates += [file_path+"#"+str(copy) for copy in range(copies)]
+    return candidates
+
+def print_latencies(name, latencies):
+    latencies = sorted(latencies)
+    print(name+":", colors.INFO+"{:.3f}".format(1000 * sum(latencies) / len(latencies))+colors.END, "ms mean,", colors.INFO+"{:.3f}".format(1000 * latencies[len(latencies) // 2])+colors.END, "ms median,", colors.INFO+"{:.3f}".format(1000 * latencies[int(len(latencies) * 0.99)])+colors.END, "ms 99th percentile")
+
+def benchmark_backend(args):
+    file_paths = find_dataset_files(args.dataset, args.limit)
+    documents = generate_documents(file_paths)
+    # Every document is indexed several times under different ids to measure larger indexes
+    indexed_documents = list()
+    for copy in range(args.copies):
+        for document in documents:
+            document = dict(document, file_path=document["file_path"]+"#"+str(copy))
+            indexed_documents.append((document["file_path"], document))
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.INDEX_DIRECTORY = directory
+        settings.SQLITE_INDEX_FILE = os.path.join(directory, "fingerprints.sqlite")
+        store = backends.get_backend(args.backend)
+        start = time.perf_counter()
+        store.create_index(args.index, clear_index=True)
+        indexed, existing, failed = store.add_documents(indexed_documents, args.index)
+        print("Indexed", colors.INFO+str(indexed)+colors.END, "document(s) in", colors.INFO+"{:.4f}".format(time.perf_counter() - start)+colors.END, "second(s),", colors.INFO+str(existing)+colors.END, "existing,", colors.INFO+str(failed)+colors.END, "failed.")
+
+        # A new store has to open the index again before its first query
+        backends.STORES.pop(args.backend)
+        store = backends.get_backend(args.backend)
+        start = time.perf_counter()
+        store.get_matching_items(args.index, documents[0]["fingerprint"], args.threshold)
+        print("Opening the index and answering the first query:", colors.INFO+"{:.4f}".format(time.perf_counter() - start)+colors.END, "second(s)")
+
+        document_ngrams = [(document["file_path"], set(generate_ngrams(document["fingerprint"], settings.NGRAM_SIZE))) for document in documents]
+        latencies = list()
+        mismatches = list()
+        truncated = 0
+        for document in documents:
+            items, query_time = store.get_matching_items(args.index, document["fingerprint"], args.threshold)
+            latencies.append(query_time)
+            candidates = [file_path for _, file_path, _ in items]
+            reference = get_reference_candidates(document_ngrams, document["fingerprint"], args.threshold, args.copies)
+            # Candidates are only comparable as sets if the query was not truncated to the maximum number of results
+            if len(reference) > settings.ELASTICSEARCH_MAX_RESULTS:
+                truncated += 1
+                if len(candidates) != settings.ELASTICSEARCH_MAX_RESULTS or not set(candidates) <= set(reference):
+                    mismatches.append(document["file_path"])
+            elif sorted(candidates) != sorted(reference):
+                mismatches.append(document["file_path"])
+
+    if mismatches:
+        print(colors.FAIL+str(len(mismatches))+" of "+str(len(documents))+" queries return other candidates than the minimum_should_match reference, e.g.: "+mismatches[0]+colors.END)
+    else:
+        print(colors.OK+"All "+str(len(documents))+" queries return the candidates of the minimum_should_match reference ("+str(truncated)+" truncated to "+str(settings.ELASTICSEARCH_MAX_RESULTS)+" results)."+colors.END)
+    print_latencies("Candidate retrieval", latencies)
+
+    return not mismatches
+
+def benchmark_lsh(args):
+    from utils.backends.lsh import LSHIndex, get_lsh_parameters
+    from utils.backends.memory import InvertedIndex
+
+    file_paths = find_dataset_files(args.dataset, args.limit)
+    documents = generate_documents(file_paths)
+    document_ngrams = [(document["file_path"], set(generate_ngrams(document["fingerprint"], settings.NGRAM_SIZE))) for document in documents]
+    # Numbers of the matches of every query without a maximum number of results, a number identifies a copy of a document
+    references = list()
+    for document in documents:
+        matches = get_reference_candidates(document_ngrams, document["fingerprint"], args.threshold, 1)
+        numbers = {file_path: number for number, file_path in enumerate([file_path for file_path, _ in document_ngrams])}
+        references.append({numbers[match[:-2]] + copy * len(documents) for match in matches for copy in range(args.copies)})
+    # Matches that also pass the Levenshtein threshold, which are the clones reported when matching
+    threshold = int(settings.LEVENSHTEIN_TRESHOLD*100)
+    fingerprints = [Fingerprint.from_document(document) for document in documents]
+    clone_references = list()
+    for fingerprint, reference in zip(fingerprints, references):
+        clone_references.append({number for number in reference if CCD.compare(fingerprint, fingerprints[number % len(documents)], threshold=threshold) >= threshold})
+    total = sum([len(reference) for reference in references])
+    total_clones = sum([len(reference) for reference in clone_references])
+    print("Querying", colors.INFO+str(len(documents))+colors.END, "fingerprint(s) against", colors.INFO+str(len(documents) * args.copies)+colors.END, "indexed fingerprint(s) with", colors.INFO+str(total)+colors.END, "match(es) in total, of which", colors.INFO+str(total_clones)+colors.END, "pass the Levenshtein threshold.")
+
+    def evaluate(name, index, get_candidates, candidates_before_check=None):
+        latencies = list()
+        found, found_clones = 0, 0
+        retrieved = 0
+        for document, reference, clone_reference in zip(documents, references, clone_references):
+            start = time.perf_counter()
+            candidates = get_candidates(index, document["fingerprint"])
+            latencies.append(time.perf_counter() - start)
+            found += len(reference.intersection(candidates))
+            found_clones += len(clone_reference.intersection(candidates))
+            if candidates_before_check:
+                retrieved += len(candidates_before_check(index, document["fingerprint"]))
+        line = name+": recall "+colors.INFO+"{:.4f}".format(found / total if total else 1.0)+colors.END+" of the matches, "+colors.INFO+"{:.4f}".format(found_clones / total_clones if total_clones else 1.0)+colors.END+" of the clones"
+        if candidates_before_check:
+            line += ", "+colors.INFO+"{:.1f}".format(retrieved / len(documents))+colors.END+" distinct candidate fingerprint(s) per query before the n-gram check"
+        print(line)
+        print_latencies("  Latency", latencies)
+
+    inverted_index = InvertedIndex()
+    for copy in range(args.copies):
+        for document in documents:
+            inverted_index.add_document(document["file_path"]+"#"+str(copy), document)
+    inverted_index.build_postings()
+    evaluate("N-gram query limited to "+str(settings.ELASTICSEARCH_MAX_RESULTS)+" results", inverted_index, lambda index, fingerprint: index.get_candidates(fingerprint, args.threshold))
+
+    bands, rows = get_lsh_parameters(args.threshold, args.permutations)
+    configurations = [(bands, rows)] + [(args.permutations // r, r) for r in args.rows if (args.permutations // r, r) != (bands, rows)]
+    for bands, rows in configurations:
+        lsh_index = LSHIndex(permutations=args.permutations, bands=bands, rows=rows)
+        start = time.perf_counter()
+        for copy in range(args.copies):
+            for document in documents:
+                lsh_index.add_document(document["file_path"]+"#"+str(copy), document)
+        lsh_index.build_buckets()
+        name = "LSH with "+str(bands)+" band(s) of "+str(rows)+" row(s)"+(" (derived from the threshold)" if (bands, rows) == configurations[0] else "")
+        print(name, "indexed in", colors.INFO+"{:.4f}".format(time.perf_counter() - start)+colors.END, "second(s)")
+        evaluate(name, lsh_index, lambda index, fingerprint: index.get_candidates(fingerprint, args.threshold), lambda index, fingerprint: index.get_bucket_groups(generate_ngram_keys(fingerprint, settings.NGRAM_SIZE)))
+
+    return True
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--dataset", type=str, default=DATASET, help="Folder with Solidity source code files (default: '"+DATASET+"')")
+    parser.add_argument(
+        "--limit", type=int, help="Maximum number of files taken from the dataset")
+    parser.add_argument(
+        "--repetitions", type=int, default=5, help="Number of repetitions of each measurement, the fastest one is reported (default: '5')")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    tokenizer_parser = subparsers.add_parser("tokenizer", help="Compare the single-pass tokenizer of statements with the previous successive passes")
+    tokenizer_parser.add_argument(
+        "--largest", type=int, default=10, help="Number of largest contracts used for the micro-benchmark (default: '10')")
+    tokenizer_parser.set_defaults(function=benchmark_tokenizer)
+    segmenter_parser = subparsers.add_parser("segmenter", help="Compare the segmenter of normalized source code with the previous per-character loop")
+    segmenter_parser.set_defaults(function=benchmark_segmenter)
+    normalizer_parser = subparsers.add_parser("normalizer", help="Compare the normalizer with its original implementation or the one at a git revision")
+    normalizer_parser.add_argument(
+        "--revision", type=str, help="Git revision of the reference implementation (default: the original normalizer in reference_normalizer.py)")
+    normalizer_parser.add_argument(
+        "--largest", type=int, default=10, help="Number of largest contracts used for the benchmark (default: '10')")
+    normalizer_parser.add_argument(
+        "--threads", type=int, default=4, help="Number of threads normalizing the dataset concurrently (default: '4')")
+    normalizer_parser.set_defaults(function=benchmark_normalizer)
+    ast_parser = subparsers.add_parser("ast", help="Compare the compact slotted AST nodes with the dictionary nodes")
+    ast_parser.add_argument(
+        "--largest", type=int, default=10, help="Number of largest contracts used for the benchmark (default: '10')")
+    ast_parser.set_defaults(function=benchmark_ast)
+    parsing_parser = subparsers.add_parser("parsing", help="Compare the two-stage SLL/LL parsing with full LL parsing")
+    parsing_parser.add_argument(
+        "--largest", type=int, default=10, help="Number of largest contracts used for the benchmark (default: '10')")
+    parsing_parser.set_defaults(function=benchmark_parsing)
+    prediction_cache_parser = subparsers.add_parser("prediction-cache", help="Compare parsing in a new process with a cold and with a persisted prediction cache")
+    prediction_cache_parser.add_argument(
+        "--seed-files", type=int, default=settings.PARSER_WARM_UP_FILES, help="Number of files parsed to warm up the prediction cache (default: '"+str(settings.PARSER_WARM_UP_FILES)+"')")
+    prediction_cache_parser.set_defaults(function=benchmark_prediction_cache)
+    backend_parser = subparsers.add_parser("backend", help="Check the candidates of a fingerprint store against a brute-force minimum_should_match reference and measure its query latency")
+    backend_parser.add_argument(
+        "--backend", type=str, default="memory", choices=list(backends.BACKENDS), help="Fingerprint store to benchmark (default: 'memory')")
+    backend_parser.add_argument(
+        "--index", type=str, default="benchmark", help="Index created for the benchmark (default: 'benchmark')")
+    backend_parser.add_argument(
+        "--copies", type=int, default=1, help="Number of times every document is indexed (default: '1')")
+    backend_parser.add_argument(
+        "--threshold", type=float, default=settings.NGRAM_THRESHOLD, help="N-gram threshold of the queries (default: '"+str(settings.NGRAM_THRESHOLD)+"')")
+    backend_parser.set_defaults(function=benchmark_backend)
+    lsh_parser = subparsers.add_parser("lsh", help="Measure the recall and latency of the MinHash/LSH candidate retrieval against the n-gram query")
+    lsh_parser.add_argument(
+        "--copies", type=int, default=1, help="Number of times every document is indexed (default: '1')")
+    lsh_parser.add_argument(
+        "--threshold", type=float, default=settings.NGRAM_THRESHOLD, help="N-gram threshold of the queries (default: '"+str(settings.NGRAM_THRESHOLD)+"')")
+    lsh_parser.add_argument(
+        "--permutations", type=int, default=settings.LSH_PERMUTATIONS, help="Number of MinHash permutations (default: '"+str(settings.LSH_PERMUTATIONS)+"')")
+    lsh_parser.add_argument(
+        "--rows", type=int, nargs="*", default=[1, 2, 4, 8], help="Numbers of rows per band compared besides the derived ones, using all permutations (default: '1 2 4 8')")
+    lsh_parser.set_defaults(function=benchmark_lsh)
+    args = parser.parse_args()
+
+    sys.setrecursionlimit(settings.PYTHON_RECURSION_LIMIT)
+
+    if not args.function(args):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()